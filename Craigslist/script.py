@@ -8,8 +8,18 @@ maintainable codebase organized in the src/ directory.
 
 import asyncio
 from src.main import main
+from src.log import setup_logging
+try:
+    import uvloop
+except ImportError:
+    # uvloop is unavailable on Windows; fall back to the default asyncio loop
+    uvloop = None
 
 print("Starting script...")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    setup_logging()
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
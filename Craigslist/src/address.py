@@ -0,0 +1,21 @@
+"""Address parsing shared by the agent configuration and the web app."""
+
+import re
+from typing import Tuple
+
+
+# "..., City, ST 12345" and a trailing ZIP / ZIP+4
+_CITY_POSTAL_RE = re.compile(r",\s*([A-Za-z .'-]+),\s*[A-Z]{2}\s*(\d{5})")
+_POSTAL_RE = re.compile(r"(\d{5})(?:-\d{4})?$")
+
+
+def parse_city_postal(address: str) -> Tuple[str, str]:
+    """Best-effort split of a full street address into (city, postal_code)."""
+    m = _CITY_POSTAL_RE.search(address)
+    if m:
+        return m.group(1).strip(), m.group(2).strip()
+    m2 = _POSTAL_RE.search(address)
+    postal = m2.group(1) if m2 else ""
+    parts = [p.strip() for p in address.split(",") if p.strip()]
+    city = parts[-2] if len(parts) >= 2 else (parts[0] if parts else "")
+    return city, postal
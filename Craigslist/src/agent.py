@@ -2,6 +2,7 @@
 
 import asyncio
 from typing import Tuple, Optional, Any
+import httpx
 from browser_use import Agent, Browser, ChatGoogle
 try:
     from browser_use import ChatOpenAI
@@ -10,20 +11,78 @@ except ImportError:
     ChatOpenAI = None
 
 from .config import Config
+from .llm_cache import CachedChat
+from .log import logger
+
+
+# Standing instructions shared by every phase; sent once as part of the system prompt
+# instead of being repeated in each task.
+SYSTEM_GUIDANCE = (
+    "When posting on Craigslist: "
+    "if the page asks 'choose the location that fits best:', select the first option. "
+    "If the page asks for the neighbourhood, select the first option."
+)
+
+# Budget for the direct (non-LLM) publish click before falling back to the agent
+PUBLISH_FAST_TIMEOUT = 20
+
+# Preview page: click the 'publish' button. Returns 'clicked' or 'not_found'.
+PUBLISH_CLICK_JS = r"""
+(() => {
+  const label = (el) => (el.value || el.textContent || '').trim();
+  const btn = document.querySelector('button[value*="publish" i], input[type="submit"][value*="publish" i]')
+    || Array.from(document.querySelectorAll('button, input[type="submit"]')).find(el => /^publish$/i.test(label(el)));
+  if (!btn) return 'not_found';
+  btn.click();
+  return 'clicked';
+})()
+"""
+
+# After the click: confirm a secondary publish dialog (only buttons inside a dialog, never
+# elsewhere on the page) and resolve 'published' once the publish button is gone, or
+# 'pending' after `ms`.
+PUBLISH_WAIT_JS = r"""
+((ms) => new Promise((resolve) => {
+  let done = false;
+  let mo = null;
+  const label = (el) => (el.value || el.textContent || '').trim();
+  const buttons = () => Array.from(document.querySelectorAll('button, input[type="submit"]'));
+  const finish = (state) => {
+    if (done) return;
+    done = true;
+    if (mo) mo.disconnect();
+    resolve(state);
+  };
+  const check = () => {
+    const confirm = Array.from(document.querySelectorAll(
+      'dialog[open] button, [role="dialog"] button, [role="alertdialog"] button, ' +
+      'dialog[open] input[type="submit"], [role="dialog"] input[type="submit"], [role="alertdialog"] input[type="submit"]'
+    )).find(el => /^(confirm|yes|ok|publish)$/i.test(label(el)));
+    if (confirm) confirm.click();
+    const publish = buttons().some(el => /^publish$/i.test(label(el)) || /publish/i.test(el.value || ''));
+    if (!publish && document.readyState !== 'loading') finish('published');
+  };
+  check();
+  if (done) return;
+  mo = new MutationObserver(check);
+  mo.observe(document, {subtree: true, childList: true, attributes: true});
+  setTimeout(() => finish('pending'), ms);
+}))
+"""
 
 
 async def run_with_timeout(coro, timeout: float, phase: str) -> Tuple[bool, Optional[Any]]:
     """Run an awaitable with a timeout, logging start/finish. Returns (ok, result)."""
-    print(f"[phase] Starting: {phase} (timeout={int(timeout)}s)")
+    logger.info("[phase] Starting: %s (timeout=%ds)", phase, int(timeout))
     try:
         result = await asyncio.wait_for(coro, timeout=timeout)
-        print(f"[phase] Completed: {phase}")
+        logger.info("[phase] Completed: %s", phase)
         return True, result
     except asyncio.TimeoutError:
-        print(f"[timeout] Phase timed out: {phase} after {int(timeout)}s")
+        logger.warning("[timeout] Phase timed out: %s after %ds", phase, int(timeout))
         return False, None
     except Exception as e:
-        print(f"[error] Phase failed: {phase}: {e}")
+        logger.error("[error] Phase failed: %s: %s", phase, e)
         return False, None
 
 
@@ -32,7 +91,7 @@ async def agent_run(agent: Agent, max_steps: int, timeout: int, phase: str) -> T
     try:
         return await run_with_timeout(agent.run(max_steps=max_steps), timeout=timeout, phase=phase)
     except Exception as e:
-        print(f"[agent] Error during phase '{phase}': {e}")
+        logger.error("[agent] Error during phase '%s': %s", phase, e)
         return False, None
 
 
@@ -43,21 +102,34 @@ class CraigslistAgent:
         self.config = config
         self.browser = browser
         
+        self.http_client: Optional[httpx.AsyncClient] = None
+
         # Initialize LLM strictly per ENV-configured provider/model (no in-code defaults)
         api_key, provider = config.validate_api_key()
         model = (self.config.llm_model or "").strip()
         if provider == "openai":
             if not ChatOpenAI:
                 raise ValueError("[llm] LLM_PROVIDER=openai but ChatOpenAI is unavailable in browser-use. Install a version exposing ChatOpenAI or set LLM_PROVIDER=google.")
-            print(f"[llm] Using OpenAI {model} (key: ...{api_key[-8:]})")
-            self.llm = ChatOpenAI(model=model, api_key=api_key)
+            logger.info("[llm] Using OpenAI %s (key: ...%s)", model, api_key[-8:])
+            # One pooled keep-alive (HTTP/2) client for every completion in the run
+            self.http_client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+                timeout=httpx.Timeout(60.0),
+            )
+            self.llm = ChatOpenAI(model=model, api_key=api_key, http_client=self.http_client)
         elif provider == "google":
-            print(f"[llm] Using Google Gemini {model} (key: ...{api_key[-8:]})")
+            logger.info("[llm] Using Google Gemini %s (key: ...%s)", model, api_key[-8:])
             self.llm = ChatGoogle(model=model)
         else:
             raise ValueError(f"[llm] Unsupported provider '{provider}' from config")
+        if self.config.llm_cache:
+            logger.info("[llm] Response cache enabled (.llm_cache.sqlite)")
+            self.llm = CachedChat(self.llm)
         
         self.agent: Optional[Agent] = None
+        # Set once the direct publish click has landed; the agent must not publish again after it
+        self.publish_clicked = False
         
     def create_agent(self, task: str, available_file_paths: Optional[list[str]] = None) -> Agent:
         """Create a new agent with the specified task."""
@@ -66,20 +138,32 @@ class CraigslistAgent:
             "llm": self.llm,
             "headless": self.config.headless,
             "browser_session": self.browser,
+            "extend_system_message": SYSTEM_GUIDANCE,
         }
         if available_file_paths:
             kwargs["available_file_paths"] = available_file_paths
         self.agent = Agent(**kwargs)
         return self.agent
+
+    async def aclose(self) -> None:
+        """Close the pooled LLM HTTP client, if one was created."""
+        if self.http_client is not None:
+            try:
+                await self.http_client.aclose()
+            except Exception as e:
+                logger.warning("[llm] Failed to close HTTP client: %s", e)
+            self.http_client = None
+
+    def get_agent(self, task: str) -> Agent:
+        """Queue task on the shared agent, creating it on first use."""
+        if self.agent is None:
+            return self.create_agent(task)
+        self.agent.add_new_task(task)
+        return self.agent
         
     async def navigate_to_posting_form_with_cookies(self) -> bool:
         """Navigate directly to posting form using saved cookies."""
-        task = (
-            f"Navigate to https://post.craigslist.org and press the create a post button, "
-            f"click for sale by owner, {self.config.category} continue until you reach the form to fill out the posting details"
-            f"if the page asks for 'choose the location that fits best:', select the first option."
-        )
-        agent = self.create_agent(task)
+        agent = self.get_agent(self.config.prompts.navigate_task)
         ok, _ = await agent_run(
             agent, 
             max_steps=40, 
@@ -90,12 +174,7 @@ class CraigslistAgent:
         
     async def initiate_email_login(self) -> bool:
         """Start the email login flow."""
-        task = (
-            "First go to https://sfbay.craigslist.org/ and wait for the homepage to fully load. "
-            "Then go to the login page by either clicking the 'my account' or 'log in' link, or by navigating directly to https://accounts.craigslist.org/login. "
-            f"On the login page, set the email to {self.config.email} and press the 'email login link' button."
-        )
-        agent = self.create_agent(task)
+        agent = self.get_agent(self.config.prompts.login_task)
         ok, _ = await agent_run(
             agent, 
             max_steps=16, 
@@ -109,12 +188,7 @@ class CraigslistAgent:
         if not self.agent:
             raise ValueError("Agent not initialized. Call initiate_email_login first.")
             
-        self.agent.add_new_task(
-            f"Navigate to {magic_link} and press the create a post button, click for sale by owner, {self.config.category} "
-            f"if you are on a page that asks for location, put the city from: '{self.config.address}'. "
-            f"continue until you reach the form to fill out the posting details"
-            f"if the page asks for 'choose the location that fits best:', select the first option."
-        )
+        self.agent.add_new_task(self.config.prompts.magic_link_task(magic_link))
         ok, _ = await agent_run(
             self.agent, 
             max_steps=40, 
@@ -128,16 +202,7 @@ class CraigslistAgent:
         if not self.agent:
             raise ValueError("Agent not initialized.")
             
-        self.agent.add_new_task(
-            f"Fill in the posting form using these details: title='{self.config.title}', price='{self.config.price}', description='{self.config.description}', "
-            f"and set the item condition to the option closest to '{self.config.condition}' (if the condition is already filled, do not change it). "
-            f"For location put the city from: '{self.config.address}'. "
-            f"For the zip code, put the postal code from: '{self.config.address}'. "
-            f"If the site provides suggestions or auto-complete for location, select the best matching option for '{self.config.address}'. "
-            f"Proceed through the location page and continue until you reach the image upload page."
-            f"if the page asks for the neighbourhood, select the first option."
-            f"if the page asks for 'choose the location that fits best:', select the first option."
-        )
+        self.agent.add_new_task(self.config.prompts.form_task)
         ok, _ = await agent_run(
             self.agent, 
             max_steps=30, 
@@ -150,20 +215,13 @@ class CraigslistAgent:
         """Upload images to the posting."""
         # If no images specified, nothing to do
         if not image_paths:
-            print("[images] No images to upload.")
+            logger.info("[images] No images to upload.")
             return True
 
-        # Use a fresh agent instance for the upload phase to avoid EventBus name collisions
-        task = (
-            "You are on the Craigslist image upload page for the current post. "
-            "If the drag-and-drop uploader is visible, prefer clicking the 'Use classic image uploader' link if the file picker is not visible. "
-            f"Upload all of the following image files from the local filesystem using the file input control (type='file'): {', '.join(image_paths)}. "
-            "If multiple selection is supported, select them all at once; otherwise, upload them sequentially. "
-            "Wait until the thumbnails/previews appear and all uploads complete. "
-            "Finally click the 'done with images' button to continue. "
-            "Do not navigate away from the image upload page until uploads complete."
-            "IF NO IMAGES ARE SHOWN ON THE PAGE AFTER YOU UPLOAD, RETRY THE UPLOAD PROCESS UNTIL THEY APPEAR OR YOU TIME OUT."
-        )
+        # Use a fresh agent instance for the upload phase: available_file_paths can only be
+        # given at construction, and this also avoids EventBus name collisions. Later
+        # phases continue on this agent.
+        task = self.config.prompts.upload_task(image_paths)
         agent = self.create_agent(task, available_file_paths=image_paths)
 
         ok, _ = await agent_run(
@@ -174,16 +232,55 @@ class CraigslistAgent:
         )
         return ok
 
+    async def _publish_via_cdp(self) -> str:
+        """Click publish directly in the page; returns 'published', 'pending' or 'not_found'."""
+        cdp_session = await self.browser.get_or_create_cdp_session()  # type: ignore[attr-defined]
+        result = await cdp_session.cdp_client.send.Runtime.evaluate(  # type: ignore[attr-defined]
+            params={"expression": PUBLISH_CLICK_JS, "returnByValue": True},
+            session_id=cdp_session.session_id,
+        )
+        if (result or {}).get("result", {}).get("value") != "clicked":
+            return "not_found"
+        self.publish_clicked = True
+
+        # The click usually navigates; retry the wait on the new document if the
+        # old execution context is destroyed underneath us, backing off between attempts.
+        delay = 0.025
+        while True:
+            try:
+                cdp_session = await self.browser.get_or_create_cdp_session()  # type: ignore[attr-defined]
+                result = await cdp_session.cdp_client.send.Runtime.evaluate(  # type: ignore[attr-defined]
+                    params={"expression": f"{PUBLISH_WAIT_JS}(5000)", "awaitPromise": True, "returnByValue": True},
+                    session_id=cdp_session.session_id,
+                )
+            except Exception:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.5)
+                continue
+            state = (result or {}).get("result", {}).get("value")
+            if state == "published":
+                return state
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
     async def publish_post(self) -> bool:
-        """Click publish on the post preview page and confirm."""
-        task = (
-            "You are on the Craigslist post preview page. "
-            "Click the 'publish' button. If any confirmation dialog or secondary 'publish'/'confirm' "
-            "button appears, confirm it. Wait until there is a clear indication the post is published "
-            "(e.g., navigated to the manage posting page, a success message, or the publish button is gone/disabled). "
-            "Then stop."
+        """Click publish on the post preview page and confirm.
+
+        Tries a direct DOM click first and only falls back to the LLM agent when the
+        button can't be found or publication can't be confirmed in time.
+        """
+        ok, state = await run_with_timeout(
+            self._publish_via_cdp(),
+            timeout=PUBLISH_FAST_TIMEOUT,
+            phase="Publish post (direct click)"
         )
-        agent = self.create_agent(task)
+        if ok and state == "published":
+            return True
+        logger.info("[publish] Direct publish %s; falling back to agent.", state or "unconfirmed")
+
+        # After a landed click the agent only verifies; clicking publish again could double-post
+        task = self.config.prompts.publish_verify_task if self.publish_clicked else self.config.prompts.publish_task
+        agent = self.get_agent(task)
         ok, _ = await agent_run(
             agent,
             max_steps=15,
@@ -4,6 +4,57 @@ import asyncio
 import os
 from typing import Tuple
 from browser_use import Browser
+from .log import logger
+try:
+    from watchfiles import awatch
+except ImportError:
+    # Without watchfiles we fall back to polling the magic link file
+    awatch = None
+
+
+MAGIC_LINK_TIMEOUT = 600  # seconds (10 min)
+
+
+def _read_magic_link(file_path: str) -> str:
+    """Return the stripped link from file_path, or "" if missing/empty/unreadable."""
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return (f.read() or "").strip()
+    except Exception:
+        return ""
+
+
+async def _wait_for_magic_link_file(file_path: str) -> str:
+    """Block until file_path contains a non-empty link and return it.
+
+    Uses OS file notifications (watchfiles) when available so we wake as soon as the
+    web frontend writes the link; otherwise polls every 0.5s.
+    """
+    link = _read_magic_link(file_path)
+    if link:
+        logger.info("[action] Magic link detected via file.")
+        return link
+
+    if awatch is not None:
+        watch_dir = os.path.dirname(os.path.abspath(file_path))
+        target = os.path.basename(file_path)
+        # yield_on_timeout re-checks the file periodically in case it was written
+        # before the watcher was armed
+        async for changes in awatch(watch_dir, rust_timeout=5000, yield_on_timeout=True):
+            if changes and not any(os.path.basename(p) == target for _, p in changes):
+                continue
+            link = _read_magic_link(file_path)
+            if link:
+                logger.info("[action] Magic link detected via file.")
+                return link
+    else:
+        while True:
+            await asyncio.sleep(0.5)
+            link = _read_magic_link(file_path)
+            if link:
+                logger.info("[action] Magic link detected via file.")
+                return link
+    return ""
 
 
 async def is_logged_in(browser: Browser) -> bool:
@@ -12,71 +63,102 @@ async def is_logged_in(browser: Browser) -> bool:
     Heuristics:
     - Logged-in if we can see a "log out" action or the "make new post" link/button.
     - Not logged-in if we see the email login form and no logged-in markers.
-    - Poll briefly to allow redirects from /login -> /home.
+    - Wait briefly (in-page, via MutationObserver) to allow redirects from /login -> /home.
     """
     try:
         # Navigate to the login endpoint (Craigslist typically redirects to /home if already authenticated)
         await browser._cdp_navigate("https://accounts.craigslist.org/login")  # type: ignore[attr-defined]
         cdp_session = await browser.get_or_create_cdp_session()  # type: ignore[attr-defined]
 
+        # Resolves as soon as a logged-in/logged-out marker shows up in the DOM, or after
+        # `ms` with whatever state the page settled on.
         script = r"""
-        (() => {
+        ((ms) => new Promise((resolve) => {
+          let done = false;
+          let mo = null;
           const byText = (txt) => {
             const t = (txt || '').toLowerCase();
             return Array.from(document.querySelectorAll('a,button'))
               .some(el => ((el.textContent || '').toLowerCase().includes(t)));
           };
-          const emailInput = document.querySelector('input#inputEmailHandle, input[name="inputEmailHandle"]');
-          const loginForm = document.querySelector('form[action*="login" i], form[action*="signin" i]');
-          const logoutByText = byText('log out');
-          const logoutHref = !!document.querySelector('a[href*="logout" i]');
-          const makeNewPost = byText('make new post');
-          return {
-            hasLoginForm: !!(emailInput || loginForm),
-            hasLogout: !!(logoutByText || logoutHref),
-            hasMakeNewPost: !!makeNewPost,
-            href: location.href,
-            ready: document.readyState
+          const probe = () => {
+            const emailInput = document.querySelector('input#inputEmailHandle, input[name="inputEmailHandle"]');
+            const loginForm = document.querySelector('form[action*="login" i], form[action*="signin" i]');
+            const logoutByText = byText('log out');
+            const logoutHref = !!document.querySelector('a[href*="logout" i]');
+            const makeNewPost = byText('make new post');
+            return {
+              hasLoginForm: !!(emailInput || loginForm),
+              hasLogout: !!(logoutByText || logoutHref),
+              hasMakeNewPost: !!makeNewPost,
+              href: location.href
+            };
+          };
+          const finish = (state, val) => {
+            if (done) return;
+            done = true;
+            if (mo) mo.disconnect();
+            resolve(Object.assign({state}, val));
+          };
+          const check = () => {
+            const val = probe();
+            if (val.hasLogout || val.hasMakeNewPost) return finish('in', val);
+            // Still on /login: give Craigslist time to redirect an authenticated session to /home
+            if (val.hasLoginForm && !/accounts\.craigslist\.org\/login/i.test(val.href)) return finish('out', val);
           };
-        })()
+          check();
+          if (done) return;
+          mo = new MutationObserver(check);
+          mo.observe(document, {subtree: true, childList: true, attributes: true});
+          setTimeout(() => {
+            const val = probe();
+            finish(val.hasLoginForm ? 'out' : 'unknown', val);
+          }, ms);
+        }))
         """
 
-        last_href = ""
-        # Poll for up to ~10 seconds (20 * 0.5s) to allow redirects and slow loads
-        for _ in range(20):
-            result = await cdp_session.cdp_client.send.Runtime.evaluate(  # type: ignore[attr-defined]
-                params={"expression": script, "returnByValue": True},
-                session_id=cdp_session.session_id,
-            )
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + 10.0
+        val: dict = {}
+        # A single awaited evaluation normally settles this; retry (with backoff) only if a
+        # redirect destroys the execution context while we are waiting.
+        delay = 0.025
+        while True:
+            remaining_ms = int((deadline - loop.time()) * 1000)
+            if remaining_ms <= 0:
+                break
+            try:
+                result = await cdp_session.cdp_client.send.Runtime.evaluate(  # type: ignore[attr-defined]
+                    params={
+                        "expression": f"{script}({remaining_ms})",
+                        "awaitPromise": True,
+                        "returnByValue": True,
+                    },
+                    session_id=cdp_session.session_id,
+                )
+            except Exception:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.5)
+                continue
             val = (result or {}).get("result", {}).get("value", {}) or {}
-            has_logout = bool(val.get("hasLogout"))
-            has_mnp = bool(val.get("hasMakeNewPost"))
-            has_login = bool(val.get("hasLoginForm"))
-            href = val.get("href", "") or ""
-            last_href = href or last_href
-
-            # Definitive logged-in signals
-            if has_logout or has_mnp:
-                return True
-
-            # If we clearly see the login form and no logged-in signals, likely not logged in
-            # But give the first few iterations time to redirect away from /login
-            if has_login and not (has_logout or has_mnp):
-                # Keep polling for a few cycles if we're still on a /login URL that might redirect
-                if "/login" in href and "accounts.craigslist.org" in href:
-                    await asyncio.sleep(0.5)
-                    continue
-                return False
-
-            # Indeterminate; wait a bit and try again
-            await asyncio.sleep(0.5)
+            if val:
+                break
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+        state = val.get("state")
+        if state == "in":
+            return True
+        if state == "out":
+            return False
 
         # Fallback: if we ended up on an account home URL, assume logged-in
+        last_href = val.get("href", "") or ""
         if "accounts.craigslist.org" in last_href and "/home" in last_href:
             return True
         return False
     except Exception as e:
-        print(f"[auth] Warning: could not verify login status: {e}")
+        logger.warning("[auth] Warning: could not verify login status: %s", e)
         return False
 
 
@@ -95,32 +177,21 @@ class AuthManager:
 
         Supports two modes:
         - CLI mode: prompts on stdin as before.
-        - Web/automation mode: if MAGIC_LINK_FILE is set in the environment, poll that file
+        - Web/automation mode: if MAGIC_LINK_FILE is set in the environment, watch that file
           until a non-empty link appears, then return it.
         """
         file_path = os.getenv("MAGIC_LINK_FILE", "").strip()
         if file_path:
-            print(f"[action] Waiting for magic link via file: {file_path}")
-            print("[action] Frontend users can paste the link into the web form; the backend will detect it automatically.")
-            # Poll up to ~10 minutes
-            for _ in range(1200):  # 1200 * 0.5s = 600s (10 min)
-                try:
-                    if os.path.exists(file_path):
-                        try:
-                            with open(file_path, "r", encoding="utf-8") as f:
-                                link = (f.read() or "").strip()
-                                if link:
-                                    print("[action] Magic link detected via file.")
-                                    return link
-                        except Exception:
-                            pass
-                except Exception:
-                    pass
-                await asyncio.sleep(0.5)
-            print("[abort] Timed out waiting for magic link file content.")
-            return ""
+            logger.info("[action] Waiting for magic link via file: %s", file_path)
+            logger.info("[action] Frontend users can paste the link into the web form; the backend will detect it automatically.")
+            # Wait up to ~10 minutes
+            try:
+                return await asyncio.wait_for(_wait_for_magic_link_file(file_path), timeout=MAGIC_LINK_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.error("[abort] Timed out waiting for magic link file content.")
+                return ""
         # Fallback: CLI prompt
-        print("[action] Check your email and copy the Craigslist login link (magic link).")
+        logger.info("[action] Check your email and copy the Craigslist login link (magic link).")
         link = await asyncio.to_thread(
             input,
             "Enter the link you received in your email (or press Enter to cancel): "
@@ -130,6 +201,6 @@ class AuthManager:
     def validate_magic_link(self, link: str) -> bool:
         """Validate that the provided link looks like a valid magic link."""
         if not link:
-            print("[abort] No link provided. Exiting so the script does not wait indefinitely.")
+            logger.error("[abort] No link provided. Exiting so the script does not wait indefinitely.")
             return False
         return True
@@ -2,11 +2,21 @@
 
 import os
 from dataclasses import dataclass
+from functools import cached_property, lru_cache
 from typing import List
+import orjson
 from dotenv import load_dotenv
+from .address import parse_city_postal
+from .log import logger
+
+@lru_cache(maxsize=None)
+def load_env_once() -> bool:
+    """Load .env into the environment once per process; later calls are a cache hit."""
+    return load_dotenv()
+
 
 # Load environment variables from .env, if present
-load_dotenv()
+load_env_once()
 
 
 def env_bool(name: str, default: bool = False) -> bool:
@@ -17,6 +27,31 @@ def env_bool(name: str, default: bool = False) -> bool:
     return val.strip().lower() in {"1", "true", "yes", "on"}
 
 
+def env_float(name: str, default: float) -> float:
+    """Convert environment variable to float (default if unset/blank)."""
+    val = os.getenv(name)
+    if val is None or val.strip() == "":
+        return default
+    return float(val)
+
+
+# Pause the browser takes between agent actions (seconds); WAIT_BETWEEN_ACTIONS overrides it
+DEFAULT_WAIT_BETWEEN_ACTIONS = 0.05
+
+
+def images_from_env() -> List[str]:
+    """Image paths from the MANIFEST JSON file (web jobs), else comma-separated IMAGES."""
+    manifest = os.getenv("MANIFEST", "").strip()
+    if manifest:
+        try:
+            with open(manifest, "rb") as f:
+                images = orjson.loads(f.read()).get("images") or []
+        except (OSError, ValueError, AttributeError) as e:
+            raise ValueError(f"Could not read image manifest {manifest}: {e}") from e
+        return [str(p).strip() for p in images if str(p).strip()]
+    return list(filter(None, map(str.strip, os.getenv("IMAGES", "").split(","))))
+
+
 def require_env(name: str) -> str:
     """Fetch a required environment variable or raise a ValueError with guidance."""
     val = os.getenv(name)
@@ -28,6 +63,86 @@ def require_env(name: str) -> str:
     return str(val).strip()
 
 
+@dataclass(frozen=True)
+class Prompts:
+    """Agent task strings for one posting, built from the configuration values.
+
+    Tasks that depend on runtime values are stored pre-split around the insertion point.
+    """
+    navigate_task: str
+    login_task: str
+    magic_link_prefix: str
+    magic_link_suffix: str
+    form_task: str
+    upload_prefix: str
+    upload_suffix: str
+    publish_task: str
+    publish_verify_task: str
+
+    def magic_link_task(self, magic_link: str) -> str:
+        """Task for opening the magic link and reaching the posting form."""
+        return self.magic_link_prefix + magic_link + self.magic_link_suffix
+
+    def upload_task(self, image_paths: List[str]) -> str:
+        """Task for uploading the given local image files."""
+        return self.upload_prefix + ", ".join(image_paths) + self.upload_suffix
+
+
+def build_prompts(email: str, category: str, title: str, condition: str, price: int,
+                  city: str, postal_code: str, description: str) -> Prompts:
+    """Assemble every agent task string for the given posting details."""
+    return Prompts(
+        navigate_task=(
+            f"Navigate to https://post.craigslist.org and press the create a post button, "
+            f"click for sale by owner, {category} continue until you reach the form to fill out the posting details."
+        ),
+        login_task=(
+            "First go to https://sfbay.craigslist.org/ and wait for the homepage to fully load. "
+            "Then go to the login page by either clicking the 'my account' or 'log in' link, or by navigating directly to https://accounts.craigslist.org/login. "
+            f"On the login page, set the email to {email} and press the 'email login link' button."
+        ),
+        magic_link_prefix="Navigate to ",
+        magic_link_suffix=(
+            f" and press the create a post button, click for sale by owner, {category} "
+            f"if you are on a page that asks for location, put the city '{city}'. "
+            f"continue until you reach the form to fill out the posting details."
+        ),
+        form_task=(
+            f"Fill in the posting form using these details: title='{title}', price='{price}', description='{description}', "
+            f"and set the item condition to the option closest to '{condition}' (if the condition is already filled, do not change it). "
+            f"For location put the city '{city}' and for the zip code put '{postal_code}', "
+            f"picking the best matching suggestion if the site offers auto-complete. "
+            f"Proceed through the location page and continue until you reach the image upload page."
+        ),
+        upload_prefix=(
+            "You are on the Craigslist image upload page for the current post. "
+            "If the drag-and-drop uploader is visible, prefer clicking the 'Use classic image uploader' link if the file picker is not visible. "
+            "Upload all of the following image files from the local filesystem using the file input control (type='file'): "
+        ),
+        upload_suffix=(
+            ". "
+            "If multiple selection is supported, select them all at once; otherwise, upload them sequentially. "
+            "Wait until the thumbnails/previews appear and all uploads complete. "
+            "Finally click the 'done with images' button to continue. "
+            "Do not navigate away from the image upload page until uploads complete."
+            "IF NO IMAGES ARE SHOWN ON THE PAGE AFTER YOU UPLOAD, RETRY THE UPLOAD PROCESS UNTIL THEY APPEAR OR YOU TIME OUT."
+        ),
+        publish_task=(
+            "You are on the Craigslist post preview page. "
+            "Click the 'publish' button. If any confirmation dialog or secondary 'publish'/'confirm' "
+            "button appears, confirm it. Wait until there is a clear indication the post is published "
+            "(e.g., navigated to the manage posting page, a success message, or the publish button is gone/disabled). "
+            "Then stop."
+        ),
+        publish_verify_task=(
+            "You are on Craigslist and the 'publish' button on the post preview page has ALREADY been clicked. "
+            "Do NOT click 'publish' again. If a publish confirmation dialog is open, confirm it. "
+            "Otherwise only check whether the post went through (e.g., the manage posting page or a success message "
+            "is shown, or the publish button is gone/disabled), then stop."
+        ),
+    )
+
+
 @dataclass
 class Config:
     """Configuration object for the Craigslist posting application."""
@@ -37,15 +152,27 @@ class Config:
     condition: str
     price: int
     address: str
+    city: str
+    postal_code: str
     description: str
     images: List[str]
     headless: bool
     highlight: bool
+    wait_between_actions: float
     t_short: int
     t_med: int
     t_long: int
     llm_provider: str
     llm_model: str
+    llm_cache: bool
+
+    @cached_property
+    def prompts(self) -> Prompts:
+        """Agent task strings, assembled on first use and reused by every phase."""
+        return build_prompts(
+            self.email, self.category, self.title, self.condition, self.price,
+            self.city, self.postal_code, self.description,
+        )
 
     def validate_api_key(self) -> tuple[str, str]:
         """Validate and return (api_key, provider) where provider is 'openai' or 'google'.
@@ -88,12 +215,21 @@ class Config:
 
     def log_config(self) -> None:
         """Log the effective configuration (ENV-driven)."""
-        print("[config] Effective configuration:\n"
-              f"  email={self.email}\n  category={self.category}\n  title={self.title}\n  price={self.price}\n"
-              f"  address={self.address}\n  headless={self.headless}\n"
-              f"  highlight={self.highlight}\n"
-              f"  timeouts(short/med/long)={self.t_short}/{self.t_med}/{self.t_long}\n"
-              f"  llm_provider={self.llm_provider}\n  llm_model={self.llm_model or '(default)'}")
+        logger.info(
+            "[config] Effective configuration:\n"
+            "  email=%s\n  category=%s\n  title=%s\n  price=%s\n"
+            "  address=%s\n  city=%s\n  postal_code=%s\n  headless=%s\n"
+            "  highlight=%s\n  wait_between_actions=%ss\n"
+            "  timeouts(short/med/long)=%s/%s/%s\n"
+            "  llm_provider=%s\n  llm_model=%s\n"
+            "  llm_cache=%s",
+            self.email, self.category, self.title, self.price,
+            self.address, self.city, self.postal_code, self.headless,
+            self.highlight, self.wait_between_actions,
+            self.t_short, self.t_med, self.t_long,
+            self.llm_provider, self.llm_model or "(default)",
+            self.llm_cache,
+        )
 
 
 def build_config() -> Config:
@@ -105,15 +241,16 @@ def build_config() -> Config:
     condition = require_env("CONDITION")
     price = int(require_env("PRICE"))
     address = require_env("ADDRESS")
+    city, postal_code = parse_city_postal(address)
     description = require_env("DESCRIPTION")
 
-    # Optional list of images (comma-separated)
-    images_env = os.getenv("IMAGES", "")
-    images = [s.strip() for s in images_env.split(",") if s.strip()]
+    # Optional list of images (manifest file or comma-separated)
+    images = images_from_env()
 
     # Browser + timeouts
     headless = env_bool("HEADLESS", False)
     highlight = env_bool("HIGHLIGHT", True)
+    wait_between_actions = env_float("WAIT_BETWEEN_ACTIONS", DEFAULT_WAIT_BETWEEN_ACTIONS)
     t_short = int(os.getenv("CRAIGS_TIMEOUT_SHORT", "120"))
     t_med = int(os.getenv("CRAIGS_TIMEOUT_MED", "300"))
     t_long = int(os.getenv("CRAIGS_TIMEOUT_LONG", "600"))
@@ -121,6 +258,7 @@ def build_config() -> Config:
     # LLM selection (ENV-required)
     llm_provider = require_env("LLM_PROVIDER").lower()
     llm_model = require_env("LLM_MODEL")
+    llm_cache = env_bool("LLM_CACHE", False)
 
     return Config(
         email=email,
@@ -129,13 +267,17 @@ def build_config() -> Config:
         condition=condition,
         price=price,
         address=address,
+        city=city or address,
+        postal_code=postal_code or address,
         description=description,
         images=images,
         headless=headless,
         highlight=highlight,
+        wait_between_actions=wait_between_actions,
         t_short=t_short,
         t_med=t_med,
         t_long=t_long,
         llm_provider=llm_provider,
         llm_model=llm_model,
+        llm_cache=llm_cache,
     )
@@ -1,61 +1,114 @@
 """Cookie management for maintaining Craigslist sessions."""
 
-import json
+import asyncio
+import hashlib
+import string
+import orjson
 from pathlib import Path
 from typing import Optional
 from browser_use import Browser
+from .log import logger
 
 
 COOKIES_DIR = Path(__file__).parent.parent / "cookies"
 
+# ASCII translation table: keep letters, digits and '-_.', map everything else to '_'
+_SAFE_CHARS = set(string.ascii_letters + string.digits + "-_.")
+_SAFE_TABLE = {c: (c if chr(c) in _SAFE_CHARS else ord("_")) for c in range(128)}
+
 
 def cookie_file_for_email(email: str) -> Path:
     """Return a filesystem-safe cookie path for a given email."""
-    safe = ''.join(ch if ch.isalnum() or ch in ('-', '_', '.') else '_' for ch in email.strip())
+    email = email.strip()
+    if email.isascii():
+        safe = email.translate(_SAFE_TABLE)
+    else:
+        safe = ''.join(ch if ch.isalnum() or ch in ('-', '_', '.') else '_' for ch in email)
     return COOKIES_DIR / f"{safe}.json"
 
 
-async def save_cookies(browser: Browser, path: Path) -> None:
-    """Persist all cookies from the current context to disk as JSON."""
-    try:
-        cookies = []
+def cookie_fingerprint(cookies: list) -> str:
+    """Order-independent blake2b digest of a cookie jar."""
+    ordered = sorted(cookies, key=lambda c: (c.get("name", ""), c.get("domain", ""), c.get("path", "")))
+    return hashlib.blake2b(orjson.dumps(ordered, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
+
+
+async def _fetch_cookies(browser: Browser) -> list:
+    """Fetch cookies via _cdp_get_cookies and Network.getAllCookies concurrently.
+
+    Returns the first non-empty result; an empty list if both fail or come back empty.
+    """
+    async def primary() -> list:
         try:
-            cookies = await browser._cdp_get_cookies()  # type: ignore[attr-defined]
+            return await browser._cdp_get_cookies() or []  # type: ignore[attr-defined]
         except Exception as e:
-            print(f"[cookies] Primary cookie fetch failed (_cdp_get_cookies): {e}. Trying CDP fallback…")
+            logger.warning("[cookies] Primary cookie fetch failed (_cdp_get_cookies): %s", e)
+            return []
 
-        if not cookies:
+    async def fallback() -> list:
+        try:
+            cdp_session = await browser.get_or_create_cdp_session()  # type: ignore[attr-defined]
             try:
-                cdp_session = await browser.get_or_create_cdp_session()  # type: ignore[attr-defined]
-                try:
-                    await cdp_session.cdp_client.send.Network.enable(  # type: ignore[attr-defined]
-                        params={},
-                        session_id=cdp_session.session_id,
-                    )
-                except Exception as e:
-                    print(f"[cookies] CDP Network.enable failed or unnecessary: {e}")
-
-                res = await cdp_session.cdp_client.send.Network.getAllCookies(  # type: ignore[attr-defined]
-                    session_id=cdp_session.session_id
+                await cdp_session.cdp_client.send.Network.enable(  # type: ignore[attr-defined]
+                    params={},
+                    session_id=cdp_session.session_id,
                 )
-                cookies = (res or {}).get("cookies", [])
             except Exception as e:
-                print(f"[cookies] CDP fallback failed (Network.getAllCookies): {e}")
+                logger.debug("[cookies] CDP Network.enable failed or unnecessary: %s", e)
+
+            res = await cdp_session.cdp_client.send.Network.getAllCookies(  # type: ignore[attr-defined]
+                session_id=cdp_session.session_id
+            )
+            return (res or {}).get("cookies", []) or []
+        except Exception as e:
+            logger.warning("[cookies] CDP fallback failed (Network.getAllCookies): %s", e)
+            return []
+
+    pending = {asyncio.create_task(primary()), asyncio.create_task(fallback())}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                cookies = task.result()
+                if cookies:
+                    return cookies
+        return []
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def save_cookies(browser: Browser, path: Path) -> None:
+    """Persist all cookies from the current context to disk as JSON."""
+    try:
+        cookies = await _fetch_cookies(browser)
 
         if not cookies:
-            print("[cookies] No cookies found to save (empty set).")
+            logger.info("[cookies] No cookies found to save (empty set).")
             path.parent.mkdir(parents=True, exist_ok=True)
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump([], f, ensure_ascii=False, indent=2)
-            print(f"[cookies] Wrote empty cookie jar to {path}")
+            path.write_bytes(b"[]")
+            # Keep the fingerprint in step with the file, or a later save of the
+            # previous jar would be skipped and leave "[]" on disk
+            path.with_suffix(".hash").write_text(cookie_fingerprint([]), encoding="utf-8")
+            logger.info("[cookies] Wrote empty cookie jar to %s", path)
             return
 
+        # Skip the write when the jar is identical to what was last saved
+        hash_path = path.with_suffix(".hash")
+        fingerprint = cookie_fingerprint(cookies)
+        try:
+            if path.exists() and hash_path.read_text(encoding="utf-8").strip() == fingerprint:
+                logger.info("[cookies] Cookies unchanged since last save (%d); skipping write.", len(cookies))
+                return
+        except OSError:
+            pass
+
         path.parent.mkdir(parents=True, exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(cookies, f, ensure_ascii=False, indent=2)
-        print(f"[cookies] Saved {len(cookies)} cookies to {path}")
+        path.write_bytes(orjson.dumps(cookies))
+        hash_path.write_text(fingerprint, encoding="utf-8")
+        logger.info("[cookies] Saved %d cookies to %s", len(cookies), path)
     except Exception as e:
-        print(f"[cookies] Warning: failed to save cookies: {e}")
+        logger.warning("[cookies] Warning: failed to save cookies: %s", e)
 
 
 async def load_cookies(browser: Browser, path: Path) -> bool:
@@ -63,13 +116,12 @@ async def load_cookies(browser: Browser, path: Path) -> bool:
     if not path.exists():
         return False
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            cookies = json.load(f)
+        cookies = orjson.loads(path.read_bytes())
         await browser._cdp_set_cookies(cookies)  # type: ignore[attr-defined]
-        print(f"[cookies] Loaded {len(cookies)} cookies from {path}")
+        logger.info("[cookies] Loaded %d cookies from %s", len(cookies), path)
         return True
     except Exception as e:
-        print(f"[cookies] Warning: failed to load cookies: {e}")
+        logger.warning("[cookies] Warning: failed to load cookies: %s", e)
         return False
 
 
@@ -82,7 +134,7 @@ class CookieManager:
         
     async def load_session(self, browser: Browser) -> bool:
         """Load existing session cookies for the browser."""
-        print(f"[config] Using cookie file: {self.cookie_file}")
+        logger.info("[config] Using cookie file: %s", self.cookie_file)
         return await load_cookies(browser, self.cookie_file)
         
     async def save_session(self, browser: Browser) -> None:
@@ -92,7 +144,7 @@ class CookieManager:
     async def cleanup_session(self, browser: Browser) -> None:
         """Final save of cookies before shutdown."""
         try:
-            print("[cookies] Final save of cookies before shutdown…")
+            logger.info("[cookies] Final save of cookies before shutdown…")
             await self.save_session(browser)
         except Exception as e:
-            print(f"[cookies] Final save failed: {e}")
+            logger.warning("[cookies] Final save failed: %s", e)
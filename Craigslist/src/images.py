@@ -1,13 +1,83 @@
 """Image handling and resolution for Craigslist posting."""
 
+import asyncio
+import os
+import stat
+import tempfile
+import orjson
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Optional
+from .log import logger
 
 
-def resolve_existing_images(image_names: List[str]) -> List[str]:
-    """Resolve image paths from common locations; log misses; return existing file paths as strings."""
-    resolved: List[str] = []
-    missing: List[str] = []
+IMAGE_CACHE_FILE = Path(__file__).parent.parent / "cookies" / ".image_cache.json"
+
+
+def _load_image_cache() -> Dict[str, Dict[str, Any]]:
+    """Load the name -> {path, mtime, size, cwd} cache; empty if absent or unreadable.
+
+    Only malformed entries and absolute names (never cached now) are dropped here; dead
+    paths are pruned on save by resolve_existing_images, which stats them anyway.
+    """
+    try:
+        data = orjson.loads(IMAGE_CACHE_FILE.read_bytes())
+    except Exception:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {
+        name: entry for name, entry in data.items()
+        if not os.path.isabs(name) and isinstance(entry, dict)
+        and isinstance(entry.get("path"), str)
+    }
+
+
+def _save_image_cache(cache: Dict[str, Dict[str, Any]]) -> None:
+    """Persist the image cache atomically (unique temp file, then os.replace).
+
+    The temp file name is unique per writer, so concurrent agent processes don't
+    clobber each other's half-written file; the last replace wins.
+    """
+    tmp = None
+    try:
+        IMAGE_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=IMAGE_CACHE_FILE.parent, prefix=".image_cache.", suffix=".tmp", delete=False
+        ) as f:
+            tmp = f.name
+            f.write(orjson.dumps(cache))
+        os.replace(tmp, IMAGE_CACHE_FILE)
+    except Exception as e:
+        logger.warning("[images] Warning: failed to save image cache: %s", e)
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+
+def _cache_entry_valid(entry: Any, cwd: str) -> bool:
+    """True if a cached entry still points at the same, unmodified file."""
+    if not isinstance(entry, dict) or entry.get("cwd") != cwd:
+        return False
+    try:
+        st = os.stat(entry["path"])
+    except (OSError, KeyError, TypeError):
+        return False
+    return st.st_mtime_ns == entry.get("mtime") and st.st_size == entry.get("size")
+
+
+def _regular_file(p: Path) -> bool:
+    """True if p is a regular file (or a symlink to one), using a single stat call."""
+    try:
+        return stat.S_ISREG(os.stat(p).st_mode)
+    except (OSError, ValueError):
+        return False
+
+
+def _lookup_images(names: List[str]) -> Dict[str, str]:
+    """Search the filesystem for names; return {name: resolved_path} for the ones found."""
+    found: Dict[str, str] = {}
     base_dir = Path(__file__).parent.parent
     cwd = Path.cwd()
     home = Path.home()
@@ -20,31 +90,91 @@ def resolve_existing_images(image_names: List[str]) -> List[str]:
         home / "Pictures",
     ]
 
-    for name in image_names:
-        name = str(name).strip()
-        if not name:
+    # Index bare file names across the common folders with one scandir per folder;
+    # setdefault keeps the first (highest-priority) folder's match.
+    index: Dict[str, str] = {}
+    for folder in common_dirs:
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file():
+                            index.setdefault(entry.name, entry.path)
+                    except OSError:
+                        continue
+        except OSError:
             continue
+
+    for name in names:
         # Absolute or relative path direct hit
         p = Path(name)
-        if p.exists() and p.is_file():
-            resolved.append(str(p.resolve()))
+        if _regular_file(p):
+            found[name] = str(p.resolve())
             continue
 
         # Try common folders
-        matched = False
-        for folder in common_dirs:
-            candidate = folder / name
-            if candidate.exists() and candidate.is_file():
-                resolved.append(str(candidate.resolve()))
-                matched = True
-                break
-        if not matched:
-            missing.append(name)
+        hit = index.get(name) if p.name == name else None
+        if hit:
+            found[name] = str(Path(hit).resolve())
+        else:
+            # Names with sub-directories can't come from the flat index, and it matches
+            # exactly: on case-insensitive filesystems (macOS) 'Photo.JPG' only resolves
+            # through a stat
+            for folder in common_dirs:
+                candidate = folder / name
+                if _regular_file(candidate):
+                    found[name] = str(candidate.resolve())
+                    break
+    return found
+
+
+def resolve_existing_images(image_names: List[str]) -> List[str]:
+    """Resolve image paths from common locations; log misses; return existing file paths as strings.
 
+    Results are cached in cookies/.image_cache.json and reused while the file's mtime/size
+    are unchanged, so repeat runs with the same photos skip the directory scan.
+    """
+    names = [n for n in (str(name).strip() for name in image_names) if n]
+    cwd = str(Path.cwd())
+    cache = _load_image_cache()
+
+    paths: Dict[str, str] = {}
+    misses: List[str] = []
+    for name in names:
+        entry = cache.get(name)
+        if _cache_entry_valid(entry, cwd):
+            paths[name] = entry["path"]
+        else:
+            misses.append(name)
+
+    if misses:
+        found = _lookup_images(misses)
+        # A cached name the lookup can't find anymore points at a deleted file; drop it
+        stale = [name for name in misses if name in cache and name not in found]
+        for name in stale:
+            del cache[name]
+        stored = bool(stale)
+        for name, path in found.items():
+            # Absolute paths (e.g. web job photos) resolve with one stat; caching them would
+            # only grow the file with entries for job directories that get deleted
+            if os.path.isabs(name):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            cache[name] = {"path": path, "mtime": st.st_mtime_ns, "size": st.st_size, "cwd": cwd}
+            stored = True
+        if stored:
+            _save_image_cache(cache)
+        paths.update(found)
+
+    resolved = [paths[name] for name in names if name in paths]
+    missing = [name for name in names if name not in paths]
     if missing:
-        print(f"[images] Missing files (skipped): {', '.join(missing)}")
+        logger.info("[images] Missing files (skipped): %s", ", ".join(missing))
     if resolved:
-        print(f"[images] Resolved files: {', '.join(resolved)}")
+        logger.info("[images] Resolved files: %s", ", ".join(resolved))
     return resolved
 
 
@@ -53,13 +183,20 @@ class ImageManager:
     
     def __init__(self, image_names: List[str]):
         self.image_names = image_names
-        self._resolved_images: List[str] = []
+        # None until resolved, so an empty result is cached too
+        self._resolved_images: Optional[List[str]] = None
         
     def resolve_images(self) -> List[str]:
         """Resolve image file paths from various common locations."""
-        if not self._resolved_images:
+        if self._resolved_images is None:
             self._resolved_images = resolve_existing_images(self.image_names)
         return self._resolved_images
+
+    async def resolve_images_async(self) -> List[str]:
+        """Resolve image file paths in a worker thread so filesystem probing doesn't block the event loop."""
+        if self._resolved_images is None:
+            self._resolved_images = await asyncio.to_thread(resolve_existing_images, self.image_names)
+        return self._resolved_images
         
     def has_images(self) -> bool:
         """Check if any valid image files were found."""
@@ -70,6 +207,6 @@ class ImageManager:
         """Log the current image resolution status."""
         resolved = self.resolve_images()
         if not resolved:
-            print("[images] No image files found to upload (looked in CWD, script dir, and script/images). Skipping upload phase.")
+            logger.info("[images] No image files found to upload (looked in CWD, script dir, and script/images). Skipping upload phase.")
         else:
-            print(f"[images] Found {len(resolved)} images ready for upload.")
+            logger.info("[images] Found %d images ready for upload.", len(resolved))
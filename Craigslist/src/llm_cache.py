@@ -0,0 +1,83 @@
+"""On-disk exact-match response cache for the browser-use chat models."""
+
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Optional
+from .log import logger
+
+try:
+    from browser_use.llm.views import ChatInvokeCompletion
+except ImportError:
+    ChatInvokeCompletion = None
+
+
+LLM_CACHE_PATH = Path(__file__).parent.parent / ".llm_cache.sqlite"
+
+
+class CachedChat:
+    """Thin proxy around a browser-use chat model that replays identical requests from SQLite.
+
+    The cache key is sha256(model || output schema || messages), so a hit only happens when
+    the agent sends exactly the same conversation (including page state) as a previous run.
+    Every other attribute is delegated to the wrapped model.
+    """
+
+    def __init__(self, inner: Any, path: Path = LLM_CACHE_PATH):
+        self._inner = inner
+        self._path = path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._inner, name)
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self._path))
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, response TEXT NOT NULL)")
+        return self._conn
+
+    def _key(self, messages: list, output_format: Any) -> str:
+        h = hashlib.sha256()
+        h.update(str(getattr(self._inner, "model", "")).encode("utf-8"))
+        h.update(b"\0")
+        h.update((getattr(output_format, "__name__", "") or "").encode("utf-8"))
+        for m in messages:
+            h.update(b"\0")
+            dump = m.model_dump_json() if hasattr(m, "model_dump_json") else json.dumps(m, sort_keys=True, default=str)
+            h.update(dump.encode("utf-8"))
+        return h.hexdigest()
+
+    async def ainvoke(self, messages: list, output_format: Any = None) -> Any:
+        """Return a cached completion for identical requests, otherwise call the wrapped model."""
+        if ChatInvokeCompletion is None:
+            return await self._inner.ainvoke(messages, output_format)
+
+        key = self._key(messages, output_format)
+        try:
+            row = self._db().execute("SELECT response FROM cache WHERE key=?", (key,)).fetchone()
+            if row:
+                if output_format is not None:
+                    completion = output_format.model_validate_json(row[0])
+                else:
+                    completion = json.loads(row[0])
+                return ChatInvokeCompletion(completion=completion, usage=None)
+        except Exception as e:
+            logger.warning("[llm] Cache read failed, calling model: %s", e)
+
+        result = await self._inner.ainvoke(messages, output_format)
+        try:
+            completion = result.completion
+            if hasattr(completion, "model_dump_json"):
+                payload = completion.model_dump_json()
+            else:
+                payload = json.dumps(completion)
+            db = self._db()
+            db.execute("INSERT OR REPLACE INTO cache (key, response) VALUES (?, ?)", (key, payload))
+            db.commit()
+        except Exception as e:
+            logger.warning("[llm] Cache write failed: %s", e)
+        return result
@@ -0,0 +1,41 @@
+"""Buffered logging for Craigslist Post Helper.
+
+Modules log through the shared ``cl`` logger with %-style arguments, so formatting is
+deferred until a record passes the level check. Records are handed to a QueueHandler and
+written to stdout by a QueueListener thread, keeping console IO off the event loop.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+logger = logging.getLogger("cl")
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(level: Optional[str] = None) -> None:
+    """Install the queue-backed stdout handler on the ``cl`` logger (idempotent).
+
+    Level comes from the argument, else LOG_LEVEL (default INFO).
+    """
+    global _listener
+    if _listener is not None:
+        return
+    level_name = (level or os.getenv("LOG_LEVEL") or "INFO").strip().upper()
+    logger.setLevel(getattr(logging, level_name, logging.INFO))
+
+    # stdout (not stderr) so the web frontend, which streams the agent's stdout, sees the same lines
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(q))
+    logger.propagate = False
+
+    _listener = QueueListener(q, handler)
+    _listener.start()
+    atexit.register(_listener.stop)
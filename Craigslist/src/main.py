@@ -1,191 +1,287 @@
 """Main entry point for Craigslist Post Helper."""
 
 import asyncio
+from typing import Final, Optional
 from browser_use import Browser
-from .config import build_config
+from .config import DEFAULT_WAIT_BETWEEN_ACTIONS, build_config, env_float
 from .cookies import CookieManager
 from .auth import AuthManager
 from .images import ImageManager
 from .agent import CraigslistAgent
+from .log import logger, setup_logging
+try:
+    import uvloop
+except ImportError:
+    # uvloop is unavailable on Windows; fall back to the default asyncio loop
+    uvloop = None
+
+
+# Element highlight overlay (captures clicks/focus). Collapsed to a single line once at
+# import so each CDP injection sends a compact payload.
+_HIGHLIGHT_SCRIPT: Final[str] = " ".join(line.strip() for line in r"""
+(function(){try{
+  if (window.__cl_highlight_installed) return;
+  window.__cl_highlight_installed = true;
+  const ov = document.createElement('div');
+  ov.id = '__cl_highlight_box';
+  Object.assign(ov.style, {
+    position: 'fixed',
+    border: '2px solid #00e5ff',
+    borderRadius: '4px',
+    background: 'rgba(0,229,255,0.08)',
+    pointerEvents: 'none',
+    zIndex: '2147483647',
+    display: 'none',
+    transition: 'all 0.05s ease'
+  });
+  document.documentElement.appendChild(ov);
+  const show = (el) => {
+    if (!el || !el.getBoundingClientRect) return;
+    const r = el.getBoundingClientRect();
+    ov.style.left = r.left + 'px';
+    ov.style.top = r.top + 'px';
+    ov.style.width = Math.max(0, r.width) + 'px';
+    ov.style.height = Math.max(0, r.height) + 'px';
+    ov.style.display = 'block';
+    clearTimeout(ov._t);
+    ov._t = setTimeout(() => { ov.style.display = 'none'; }, 1200);
+  };
+  window.__cl_highlight = show;
+  const onEv = (e) => { show(e.target); };
+  document.addEventListener('mousedown', onEv, {capture:true});
+  document.addEventListener('click', onEv, {capture:true});
+  document.addEventListener('focusin', onEv, {capture:true});
+  document.addEventListener('keyup', onEv, {capture:true});
+}catch(e){}})();
+""".splitlines() if line.strip())
+
+
+# Resolves once the current document has fired its load event
+_WAIT_FOR_LOAD_JS: Final[str] = (
+    "new Promise(r => document.readyState === 'complete' ? r(true)"
+    " : window.addEventListener('load', () => r(true), {once: true}))"
+)
+
+
+def _report_overlay_registration(task: "asyncio.Task") -> None:
+    """Done-callback for the fire-and-forget overlay registration."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("[ux] Highlight overlay registration failed: %s", task.exception())
+
+
+async def _abort_browser_start(browser: Browser, start_task: "asyncio.Task") -> None:
+    """Cancel a pending browser start and shut the browser down (used when config is invalid)."""
+    start_task.cancel()
+    try:
+        await start_task
+    except (asyncio.CancelledError, Exception):
+        pass
+    try:
+        await browser.kill()  # type: ignore[attr-defined]
+    except Exception as e:
+        logger.warning("[startup] Warning: could not stop browser: %s", e)
+
+
+async def _prefetch_accounts_page(browser: Browser) -> Optional[str]:
+    """Open the accounts site in a background tab while the user fetches the magic link.
+
+    The magic link points at accounts.craigslist.org, so this warms DNS/TLS and the
+    HTTP cache for that origin without touching the agent's tab. Returns the tab's
+    target id (None if it couldn't be opened) for _close_prefetch_tab.
+    """
+    try:
+        cdp_session = await browser.get_or_create_cdp_session()  # type: ignore[attr-defined]
+        res = await cdp_session.cdp_client.send.Target.createTarget(  # type: ignore[attr-defined]
+            params={"url": "https://accounts.craigslist.org/login", "background": True},
+        )
+        return (res or {}).get("targetId")
+    except Exception as e:
+        logger.warning("[nav] Accounts page prefetch failed: %s", e)
+        return None
+
+
+async def _close_prefetch_tab(browser: Browser, warm_task: "asyncio.Task") -> None:
+    """Close the prefetch tab (once it has been opened) before the agent resumes."""
+    target_id = await warm_task
+    if not target_id:
+        return
+    try:
+        cdp_session = await browser.get_or_create_cdp_session()  # type: ignore[attr-defined]
+        await cdp_session.cdp_client.send.Target.closeTarget(  # type: ignore[attr-defined]
+            params={"targetId": target_id},
+        )
+    except Exception as e:
+        logger.warning("[nav] Could not close the prefetch tab: %s", e)
 
 
 async def main():
     """Main application entry point."""
-    print("Starting Craigslist Post Helper...")
+    logger.info("Starting Craigslist Post Helper...")
+
+    # Launch the browser in the background; it is the slowest startup step and
+    # doesn't depend on the configuration, so config/manager setup overlaps it.
+    logger.info("[startup] Launching browser and LLM client…")
+    # WAIT_BETWEEN_ACTIONS is read straight from the env since Config is built after
+    # the launch starts; an invalid value is reported by build_config() below.
+    try:
+        wait_between_actions = env_float("WAIT_BETWEEN_ACTIONS", DEFAULT_WAIT_BETWEEN_ACTIONS)
+    except ValueError:
+        wait_between_actions = DEFAULT_WAIT_BETWEEN_ACTIONS
+    browser = Browser(keep_alive=True, wait_between_actions=wait_between_actions)
+    start_task = asyncio.create_task(browser.start())
     
-    # Build configuration from CLI args and environment
+    # Build configuration from CLI args and environment (in a worker thread so the
+    # event loop keeps driving browser.start() meanwhile)
     try:
-        cfg = build_config()
+        cfg = await asyncio.to_thread(build_config)
         cfg.log_config()
         
         # Validate API key early
         cfg.validate_api_key()
     except ValueError as e:
-        print(f"[config] {e}")
+        logger.error("[config] %s", e)
+        await _abort_browser_start(browser, start_task)
         return
     
     # Initialize managers
     cookie_manager = CookieManager(cfg.email)
     auth_manager = AuthManager(cfg.email)
     image_manager = ImageManager(cfg.images)
+    # Resolve images in the background from the start; only the upload phase needs them,
+    # so the filesystem work overlaps browser startup, navigation, login and form filling.
+    images_task = asyncio.create_task(image_manager.resolve_images_async())
     
-    browser = None
+    agent = None
     try:
-        # Launch browser and initialize agent
-        print("[startup] Launching browser and LLM client…")
-        browser = Browser(keep_alive=True, wait_between_actions=0.1)
-        await browser.start()
+        await start_task
         
         # Install element highlight overlay (captures clicks/focus) if enabled
         if cfg.highlight:
             try:
-                print("[ux] Installing highlight overlay for interacted elements…")
+                logger.info("[ux] Installing highlight overlay for interacted elements…")
                 cdp_session = await browser.get_or_create_cdp_session()  # type: ignore[attr-defined]
-                highlight_script = r"""
-                (function(){try{
-                  if (window.__cl_highlight_installed) return;
-                  window.__cl_highlight_installed = true;
-                  const ov = document.createElement('div');
-                  ov.id = '__cl_highlight_box';
-                  Object.assign(ov.style, {
-                    position: 'fixed',
-                    border: '2px solid #00e5ff',
-                    borderRadius: '4px',
-                    background: 'rgba(0,229,255,0.08)',
-                    pointerEvents: 'none',
-                    zIndex: '2147483647',
-                    display: 'none',
-                    transition: 'all 0.05s ease'
-                  });
-                  document.documentElement.appendChild(ov);
-                  const show = (el) => {
-                    if (!el || !el.getBoundingClientRect) return;
-                    const r = el.getBoundingClientRect();
-                    ov.style.left = r.left + 'px';
-                    ov.style.top = r.top + 'px';
-                    ov.style.width = Math.max(0, r.width) + 'px';
-                    ov.style.height = Math.max(0, r.height) + 'px';
-                    ov.style.display = 'block';
-                    clearTimeout(ov._t);
-                    ov._t = setTimeout(() => { ov.style.display = 'none'; }, 1200);
-                  };
-                  window.__cl_highlight = show;
-                  const onEv = (e) => { show(e.target); };
-                  document.addEventListener('mousedown', onEv, {capture:true});
-                  document.addEventListener('click', onEv, {capture:true});
-                  document.addEventListener('focusin', onEv, {capture:true});
-                  document.addEventListener('keyup', onEv, {capture:true});
-                }catch(e){}})();
-                """
-                # Inject on every new document
-                await cdp_session.cdp_client.send.Page.addScriptToEvaluateOnNewDocument(  # type: ignore[attr-defined]
-                    params={"source": highlight_script},
-                    session_id=cdp_session.session_id,
+                # Inject on every new document. We don't use the result, so don't wait
+                # for the round-trip; failures are reported from the done-callback.
+                register_task = asyncio.create_task(
+                    cdp_session.cdp_client.send.Page.addScriptToEvaluateOnNewDocument(  # type: ignore[attr-defined]
+                        params={"source": _HIGHLIGHT_SCRIPT},
+                        session_id=cdp_session.session_id,
+                    )
                 )
+                register_task.add_done_callback(_report_overlay_registration)
                 # Also install immediately on current document (if any)
                 await cdp_session.cdp_client.send.Runtime.evaluate(  # type: ignore[attr-defined]
-                    params={"expression": highlight_script, "returnByValue": True},
+                    params={"expression": _HIGHLIGHT_SCRIPT, "returnByValue": True},
                     session_id=cdp_session.session_id,
                 )
             except Exception as e:
-                print(f"[ux] Highlight overlay install failed: {e}")
+                logger.warning("[ux] Highlight overlay install failed: %s", e)
         
         # Navigate to SF Bay Craigslist homepage first (then login as needed)
         try:
-            print("[nav] Opening Craigslist SF Bay Area homepage…")
+            logger.info("[nav] Opening Craigslist SF Bay Area homepage…")
             await browser._cdp_navigate("https://sfbay.craigslist.org/")  # type: ignore[attr-defined]
+            # Wait for the load event from inside the page: a one-shot listener on this
+            # document, rather than a CDP event handler that would stay registered and
+            # fire on every later navigation
             cdp_session = await browser.get_or_create_cdp_session()  # type: ignore[attr-defined]
-            for _ in range(20):
-                result = await cdp_session.cdp_client.send.Runtime.evaluate(  # type: ignore[attr-defined]
-                    params={"expression": "document.readyState", "returnByValue": True},
-                    session_id=cdp_session.session_id,
+            try:
+                await asyncio.wait_for(
+                    cdp_session.cdp_client.send.Runtime.evaluate(  # type: ignore[attr-defined]
+                        params={"expression": _WAIT_FOR_LOAD_JS, "awaitPromise": True, "returnByValue": True},
+                        session_id=cdp_session.session_id,
+                    ),
+                    timeout=5.0,
                 )
-                state = (result or {}).get("result", {}).get("value", "")
-                if state == "complete":
-                    break
-                await asyncio.sleep(0.25)
-            print("[nav] Homepage loaded.")
+            except asyncio.TimeoutError:
+                logger.info("[nav] Homepage load event not seen within 5s; continuing.")
+            logger.info("[nav] Homepage loaded.")
         except Exception as e:
-            print(f"[nav] Warning: could not load homepage: {e}")
+            logger.warning("[nav] Warning: could not load homepage: %s", e)
         
         agent = CraigslistAgent(cfg, browser)
         
-        # Load cookies and check login status
+        # Load cookies, then check login status (the check depends on the cookies being in place)
         cookies_loaded = await cookie_manager.load_session(browser)
         logged_in = False
         
         if cookies_loaded:
             logged_in = await auth_manager.check_login_status(browser)
             if logged_in:
-                print("[cookies] Using saved session; skipping login.")
+                logger.info("[cookies] Using saved session; skipping login.")
             else:
-                print("[cookies] Saved cookies invalid/expired; proceeding with email login.")
+                logger.info("[cookies] Saved cookies invalid/expired; proceeding with email login.")
         
         # Handle authentication workflow
         if logged_in:
             # Use existing session to navigate to posting form
             success = await agent.navigate_to_posting_form_with_cookies()
             if not success:
-                print("[abort] Could not reach the posting form in time. Check network/site status and retry.")
+                logger.error("[abort] Could not reach the posting form in time. Check network/site status and retry.")
                 return
         else:
             # Perform email login flow
             success = await agent.initiate_email_login()
             if not success:
-                print("[abort] Login flow didn't complete in time. Re-run and try again.")
+                logger.error("[abort] Login flow didn't complete in time. Re-run and try again.")
                 return
             
-            # Get magic link from user
+            # Get magic link from user, warming the accounts site in a background tab meanwhile
+            warm_task = asyncio.create_task(_prefetch_accounts_page(browser))
             magic_link = await auth_manager.get_magic_link_from_user()
+            await _close_prefetch_tab(browser, warm_task)
             if not auth_manager.validate_magic_link(magic_link):
                 return
             
             # Complete login with magic link
             success = await agent.complete_magic_link_login(magic_link)
             if not success:
-                print("[abort] Failed to complete login and reach the posting form in time.")
+                logger.error("[abort] Failed to complete login and reach the posting form in time.")
                 return
             
             # Verify login and save cookies
             logged_in = await auth_manager.check_login_status(browser)
             if not logged_in:
-                print("[auth] Warning: Login verification failed after email flow. Proceeding to save cookies anyway for inspection.")
+                logger.warning("[auth] Warning: Login verification failed after email flow. Proceeding to save cookies anyway for inspection.")
             else:
-                print("[cookies] Login verified. Persisting cookies immediately…")
+                logger.info("[cookies] Login verified. Persisting cookies immediately…")
             await cookie_manager.save_session(browser)
         
         # Fill out the posting form
         success = await agent.fill_posting_form()
         if not success:
-            print("[abort] Form filling phase exceeded time limit. Exiting to avoid indefinite hang.")
-            await cookie_manager.save_session(browser)
+            logger.error("[abort] Form filling phase exceeded time limit. Exiting to avoid indefinite hang.")
             return
         
         # Handle image uploads
+        resolved_images = await images_task
         image_manager.log_image_status()
-        if image_manager.has_images():
-            resolved_images = image_manager.resolve_images()
+        if resolved_images:
             success = await agent.upload_images(resolved_images)
             if not success:
-                print("[warn] Image upload phase timed out. You can upload images manually in the open browser window.")
-            await cookie_manager.save_session(browser)
+                logger.warning("[warn] Image upload phase timed out. You can upload images manually in the open browser window.")
         
         # Publish the post from the preview page
         success = await agent.publish_post()
         if not success:
-            print("[warn] Publish phase did not complete in time. You can press the publish button manually in the open browser window.")
-        await cookie_manager.save_session(browser)
+            logger.warning("[warn] Publish phase did not complete in time. You can press the publish button manually in the open browser window.")
         
-        print("[success] Craigslist posting workflow completed successfully!")
+        logger.info("[success] Craigslist posting workflow completed successfully!")
         
     except Exception as e:
-        print(f"[error] Unexpected error: {e}")
-        if browser:
-            await cookie_manager.save_session(browser)
+        logger.error("[error] Unexpected error: %s", e)
     finally:
-        if browser is not None:
-            await cookie_manager.cleanup_session(browser)
+        if not images_task.done():
+            images_task.cancel()
+        # Single end-of-run snapshot (covers early returns and errors too)
+        await cookie_manager.cleanup_session(browser)
+        if agent is not None:
+            await agent.aclose()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    setup_logging()
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
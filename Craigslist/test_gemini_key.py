@@ -1,56 +1,74 @@
+import functools
 import os
 import sys
 import time
-from dotenv import load_dotenv
+from src.config import load_env_once
+from src.log import logger, setup_logging
 
 # Minimal, safe smoke test for Gemini API key.
 # Exits 0 on success, non-zero on failure with a helpful message.
 
+# Imported once at module scope so repeated main() calls reuse sys.modules
+try:
+    import google.generativeai as genai
+    _GENAI_IMPORT_ERROR = None
+except ImportError as e:
+    genai = None
+    _GENAI_IMPORT_ERROR = e
+
+
+@functools.lru_cache(maxsize=1)
+def _model(key: str, name: str):
+    """Configure genai once per key and return a shared GenerativeModel."""
+    genai.configure(api_key=key)
+    return genai.GenerativeModel(name)
+
 
 def main() -> int:
-    load_dotenv()
+    load_env_once()
     key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
     if not key:
-        print("[config] Missing GOOGLE_API_KEY or GEMINI_API_KEY. Set it in your shell or .env.")
-        print("Example (zsh): export GOOGLE_API_KEY=\"your_key\"")
+        logger.error("[config] Missing GOOGLE_API_KEY or GEMINI_API_KEY. Set it in your shell or .env.")
+        logger.info("Example (zsh): export GOOGLE_API_KEY=\"your_key\"")
         return 2
 
-    try:
-        import google.generativeai as genai
-    except Exception as e:
-        print(f"[deps] Missing google-generativeai package: {e}\nInstall with: pip install -r requirements.txt")
+    if genai is None:
+        logger.error("[deps] Missing google-generativeai package: %s\nInstall with: pip install -r requirements.txt", _GENAI_IMPORT_ERROR)
         return 3
 
     try:
-        genai.configure(api_key=key)
         # Use a fast, lightweight model; adjust if needed.
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        start = time.time()
+        model = _model(key, "gemini-2.5-flash")
+        start = time.perf_counter()
         resp = model.generate_content("hello")
-        elapsed = time.time() - start
-        text = (resp.text or "").strip() if hasattr(resp, "text") else str(resp)
-        print("[ok] Gemini API call succeeded.")
-        print(f"[timing] {elapsed:.2f}s")
+        elapsed = time.perf_counter() - start
+        try:
+            text = (resp.text or "").strip()
+        except AttributeError:
+            text = str(resp)
+        logger.info("[ok] Gemini API call succeeded.")
+        logger.info("[timing] %.2fs", elapsed)
         # Sanitize and shorten without using backslashes inside f-string expressions
         snippet = text.replace("\n", " ")
         if len(snippet) > 200:
             snippet_display = snippet[:200] + "…"
         else:
             snippet_display = snippet
-        print(f"[response] {snippet_display}")
+        logger.info("[response] %s", snippet_display)
         return 0
     except Exception as e:
         # Provide a hint for some common failure modes
         msg = str(e)
         if "API key" in msg or "permission" in msg.lower():
-            print("[error] Authentication failed. Check that your API key is valid and has access to the model.")
+            logger.error("[error] Authentication failed. Check that your API key is valid and has access to the model.")
         elif "quota" in msg.lower():
-            print("[error] Quota or rate limit issue.")
+            logger.error("[error] Quota or rate limit issue.")
         else:
-            print("[error] Gemini test failed.")
-        print(f"[detail] {msg}")
+            logger.error("[error] Gemini test failed.")
+        logger.error("[detail] %s", msg)
         return 1
 
 
 if __name__ == "__main__":
+    setup_logging()
     sys.exit(main())
@@ -1,39 +1,57 @@
 #!/usr/bin/env python3
 """Test OpenAI API key functionality."""
 
+import functools
 import os
 import sys
 import time
-from dotenv import load_dotenv
+import httpx
+from src.config import load_env_once
+from src.log import logger, setup_logging
+
+# Imported once at module scope so repeated main() calls reuse sys.modules
+try:
+    from openai import OpenAI
+    _OPENAI_IMPORT_ERROR = None
+except ImportError as e:
+    OpenAI = None
+    _OPENAI_IMPORT_ERROR = e
+
+
+@functools.lru_cache(maxsize=1)
+def _client(key: str) -> "OpenAI":
+    """Return a shared OpenAI client (and its connection pool) for this key.
+
+    No retries and a tight timeout, so a bad key or network fails fast instead of hanging.
+    """
+    return OpenAI(api_key=key, max_retries=0, timeout=httpx.Timeout(10.0, connect=3.0))
 
 
 def main() -> int:
-    load_dotenv()
+    load_env_once()
     key = os.getenv("OPENAI_API_KEY")
     if not key:
-        print("[config] Missing OPENAI_API_KEY. Set it in your shell or .env.")
-        print("Example (zsh): export OPENAI_API_KEY=\"your_key\"")
+        logger.error("[config] Missing OPENAI_API_KEY. Set it in your shell or .env.")
+        logger.info("Example (zsh): export OPENAI_API_KEY=\"your_key\"")
         return 2
 
-    try:
-        from openai import OpenAI
-    except Exception as e:
-        print(f"[deps] Missing openai package: {e}\nInstall with: pip install openai")
+    if OpenAI is None:
+        logger.error("[deps] Missing openai package: %s\nInstall with: pip install openai", _OPENAI_IMPORT_ERROR)
         return 3
 
     try:
-        client = OpenAI(api_key=key)
-        start = time.time()
+        client = _client(key)
+        start = time.perf_counter()
         response = client.chat.completions.create(
             model="gpt-4.1",  # Using gpt-4.1 as specified
             messages=[{"role": "user", "content": "hello"}],
             max_tokens=50
         )
-        elapsed = time.time() - start
+        elapsed = time.perf_counter() - start
         
         text = response.choices[0].message.content.strip() if response.choices else "No response"
-        print("[ok] OpenAI GPT-4.1 API call succeeded.")
-        print(f"[timing] {elapsed:.2f}s")
+        logger.info("[ok] OpenAI GPT-4.1 API call succeeded.")
+        logger.info("[timing] %.2fs", elapsed)
         
         # Sanitize and shorten response
         snippet = text.replace("\n", " ")
@@ -41,22 +59,23 @@ def main() -> int:
             snippet_display = snippet[:200] + "…"
         else:
             snippet_display = snippet
-        print(f"[response] {snippet_display}")
+        logger.info("[response] %s", snippet_display)
         return 0
     except Exception as e:
         # Provide hints for common failure modes
         msg = str(e)
         if "API key" in msg or "authentication" in msg.lower():
-            print("[error] Authentication failed. Check that your API key is valid and has access to GPT-4.1.")
+            logger.error("[error] Authentication failed. Check that your API key is valid and has access to GPT-4.1.")
         elif "quota" in msg.lower() or "limit" in msg.lower():
-            print("[error] Quota or rate limit issue.")
+            logger.error("[error] Quota or rate limit issue.")
         elif "model" in msg.lower() and "not found" in msg.lower():
-            print("[error] Model gpt-4.1 not found. Check if the model name is correct or try 'gpt-4' instead.")
+            logger.error("[error] Model gpt-4.1 not found. Check if the model name is correct or try 'gpt-4' instead.")
         else:
-            print("[error] OpenAI test failed.")
-        print(f"[detail] {msg}")
+            logger.error("[error] OpenAI test failed.")
+        logger.error("[detail] %s", msg)
         return 1
 
 
 if __name__ == "__main__":
+    setup_logging()
     sys.exit(main())
@@ -20,26 +20,55 @@
 #
 # Run:
 #   pip install -r requirements.txt
-#   python web.py
+#   python web.py                      (development server)
+#   gunicorn wsgi:app -k gevent -w 1 --worker-connections 1000 --timeout 0 --bind 0.0.0.0:5000
+#                                      (production; see wsgi.py)
 #   Visit http://127.0.0.1:5000/
 # ---------------------------------------------------------------------------------
 
 import os
 import re
-import json
+import functools
+import orjson
 import base64
+import hashlib
+import heapq
+import io
 import uuid
 import queue
+import secrets
+import selectors
+import shutil
 import threading
 import subprocess
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
 import time
 
-from flask import Flask, request, render_template_string, Response, redirect, url_for
+import httpx
+from flask import Flask, request, Response, redirect, url_for
 from dotenv import load_dotenv, dotenv_values
 from openai import OpenAI
+from src.address import parse_city_postal
+try:
+    # SIMD base64 (same API as the stdlib module); image payloads are multi-MB
+    import pybase64 as b64codec
+except ImportError:
+    b64codec = base64
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    # Without Pillow, photos are sent to the vision model at full size
+    Image = None
+try:
+    import fcntl
+except ImportError:
+    # Windows: pipe sizes can't be tuned
+    fcntl = None
 
 # Load ONLY the web app env (kept separate from Agent env)
 WEB_ENV_PATH = Path(__file__).with_name(".env.web")
@@ -53,14 +82,141 @@ JOBS_DIR = ROOT_DIR / "jobs"
 LISTINGS_DIR.mkdir(exist_ok=True)
 JOBS_DIR.mkdir(exist_ok=True)
 
-# Live job registry (job_id -> {queue, proc, magic_link_file})
-_job_registry: Dict[str, Dict[str, Any]] = {}
+JOB_TTL = 3600          # seconds a finished job (logs, photos) stays available
+JOB_MAX = 128           # registered jobs before the oldest finished ones are dropped early
+JOB_REAP_INTERVAL = 60
+
+class _JobTable:
+    """
+    Live job registry, stored column-wise: one list per field and a job_id -> row index
+    map, so sweeps over every job (heartbeats, expiry) walk a single flat list.
+    Finished jobs are dropped JOB_TTL seconds after they end, or sooner (oldest first)
+    once more than JOB_MAX jobs are registered; running and queued jobs are never dropped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.index: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self.feeds: List["_JobFeed"] = []
+        self.procs: List[Optional[subprocess.Popen]] = []
+        self.magic_files: List[Path] = []
+        self.created_ns: List[int] = []
+        self.finished_ns: List[Optional[int]] = []
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self.index
+
+    def add(self, job_id: str, feed: "_JobFeed", magic_link_file: Path) -> None:
+        with self._lock:
+            self.index[job_id] = len(self.ids)
+            self.ids.append(job_id)
+            self.feeds.append(feed)
+            self.procs.append(None)
+            self.magic_files.append(magic_link_file)
+            self.created_ns.append(time.monotonic_ns())
+            self.finished_ns.append(None)
+
+    def feed(self, job_id: str) -> "_JobFeed":
+        with self._lock:
+            return self.feeds[self.index[job_id]]
+
+    def proc(self, job_id: str) -> Optional[subprocess.Popen]:
+        with self._lock:
+            return self.procs[self.index[job_id]]
+
+    def set_proc(self, job_id: str, proc: subprocess.Popen) -> None:
+        with self._lock:
+            self.procs[self.index[job_id]] = proc
+
+    def magic_link_file(self, job_id: str) -> Path:
+        with self._lock:
+            return self.magic_files[self.index[job_id]]
+
+    def finish(self, job_id: str) -> None:
+        with self._lock:
+            self.finished_ns[self.index[job_id]] = time.monotonic_ns()
+
+    def _remove(self, row: int) -> None:
+        """Drop a row by moving the last row into its place (caller holds the lock)."""
+        last = len(self.ids) - 1
+        del self.index[self.ids[row]]
+        for col in (self.ids, self.feeds, self.procs, self.magic_files, self.created_ns, self.finished_ns):
+            col[row] = col[last]
+            col.pop()
+        if row != last:
+            self.index[self.ids[row]] = row
+
+    def expire(self) -> List[str]:
+        """Remove expired finished jobs; returns their ids."""
+        now = time.monotonic_ns()
+        with self._lock:
+            finished = sorted(
+                (done, row) for row, done in enumerate(self.finished_ns) if done is not None
+            )
+            over = max(0, len(self.ids) - JOB_MAX)
+            doomed = [
+                row for n, (done, row) in enumerate(finished)
+                if n < over or now - done > JOB_TTL * 1_000_000_000
+            ]
+            removed = [self.ids[row] for row in doomed]
+            # Highest rows first, so the swap-removal never moves a row still to be removed
+            for row in sorted(doomed, reverse=True):
+                self._remove(row)
+        return removed
+
+_jobs = _JobTable()
+
+# Server-side session payloads (sid -> raw photo bytes/user info/result) so the multi-MB
+# photos don't round-trip through hidden form fields. Sessions expire SESSION_TTL seconds
+# after their last write (swept by the job reaper); beyond SESSION_MAX the oldest go first.
+SESSION_MAX = int(os.environ.get("KRAIG_MAX_SESSIONS", "128"))
+SESSION_TTL = 1800
+_sessions: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_sessions_lock = threading.Lock()
+
+# Caps one request (the four photos of /analyze), and with it what a session can hold
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("KRAIG_MAX_UPLOAD_MB", "32")) * 1024 * 1024
+
+
+def _session_put(sid: str, data: Dict[str, Any]) -> None:
+    with _sessions_lock:
+        _sessions[sid] = (time.monotonic(), data)
+        _sessions.move_to_end(sid)
+        while len(_sessions) > SESSION_MAX:
+            _sessions.popitem(last=False)
+
+
+def _session_get(sid: str, pop: bool = False) -> Dict[str, Any]:
+    with _sessions_lock:
+        entry = _sessions.pop(sid, None) if pop else _sessions.get(sid)
+    if entry is None or time.monotonic() - entry[0] > SESSION_TTL:
+        return {}
+    return entry[1]
+
+
+def _session_expire() -> None:
+    """Drop sessions not written for SESSION_TTL seconds (the dict is in write order)."""
+    cutoff = time.monotonic() - SESSION_TTL
+    with _sessions_lock:
+        while _sessions:
+            sid, (stored_at, _) = next(iter(_sessions.items()))
+            if stored_at > cutoff:
+                break
+            del _sessions[sid]
 
 # Path to Agent .env for subprocesses (Agent backend still uses its own .env)
 AGENT_ENV_FILE = os.environ.get("AGENT_ENV_FILE", str(ROOT_DIR / ".env"))
 
-# Optional OpenAI client for vision/pricing/categorization in the web app
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+# Optional OpenAI client for vision/pricing/categorization in the web app. One pooled
+# HTTP/2 keep-alive connection pool is shared by the parallel vision calls and the
+# pricing/category calls, so TLS handshakes are paid once rather than per request.
+_http = httpx.Client(
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+    timeout=httpx.Timeout(120.0, connect=5.0),
+)
+client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"), http_client=_http)
 
 # Craigslist category list (single source of truth)
 CATEGORIES = [
@@ -111,6 +267,21 @@ CATEGORIES = [
     "wanted"
 ]
 
+# Derived once at import: lowercase -> canonical category (O(1) lookup of model output),
+# and the keyword fallback used when the classifier gives no usable answer
+_CAT_LOWER = {c.lower(): c for c in CATEGORIES}
+_CATEGORY_KEYWORDS = (
+    (("chair","sofa","table","dresser","stool","couch","desk","bed","cabinet"), "furniture"),
+    (("iphone","samsung","pixel","android","smartphone","cell"), "cell phones"),
+    (("laptop","macbook","surface","notebook"), "computers"),
+    (("camera","lens","dslr","mirrorless","tripod"), "photo/video"),
+    (("guitar","piano","keyboard","drum","synth"), "musical instruments"),
+    (("ps5","xbox","nintendo","switch","gaming"), "video gaming"),
+    (("microwave","fridge","refrigerator","washer","dryer","oven","dishwasher"), "appliances"),
+    (("hammer","drill","saw","wrench","tool"), "tools"),
+    (("speaker","headphones","tv","monitor","tablet","smartwatch"), "electronics"),
+)
+
 # ---------------------------------------------------------------------------------
 # HTML (Dark mode + improved UI/branding as Kraig)
 # ---------------------------------------------------------------------------------
@@ -121,67 +292,7 @@ INDEX_HTML = """
 <head>
   <meta charset="utf-8"><meta name="viewport" content="width=device-width,initial-scale=1">
   <title>Kraig</title>
-  <style>
-    :root{
-      --bg:#0b1021;
-      --bg-2:#0d1330;
-      --card:#121831;
-      --card-2:#0f162d;
-      --text:#e5e7eb;
-      --muted:#93a4bf;
-      --accent:#00e5ff;
-      --accent-2:#60a5fa;
-      --border:#1f2a44;
-      --ok:#22c55e;
-      --warn:#f59e0b;
-      --err:#ef4444;
-    }
-    *{box-sizing:border-box}
-    body{
-      font-family:system-ui,-apple-system,Segoe UI,Roboto,Helvetica,Arial,sans-serif;
-      background:linear-gradient(180deg,var(--bg) 0%,var(--bg) 35%,var(--bg-2) 100%);
-      color:var(--text);
-      max-width:980px;margin:32px auto;padding:0 16px;
-    }
-    .brand{display:flex;align-items:center;gap:12px;margin-bottom:8px}
-    .logo{
-      width:34px;height:34px;border-radius:8px;background:linear-gradient(135deg,var(--accent),var(--accent-2));
-      display:inline-block;box-shadow:0 6px 24px rgba(0,229,255,.25)
-    }
-    h1{margin:0}
-    .subtitle{color:var(--muted);margin:0 0 16px}
-    .card{
-      border:1px solid var(--border);border-radius:14px;padding:16px;margin:12px 0;
-      background:radial-gradient(1200px 500px at 100% -20%,rgba(0,229,255,0.06),transparent 60%),var(--card);
-      box-shadow:0 1px 3px rgba(0,0,0,.25)
-    }
-    .card.soft{background:var(--card-2)}
-    .grid{display:grid;gap:12px}
-    .grid-2{grid-template-columns:repeat(2,minmax(0,1fr))}
-    .muted{color:var(--muted)}
-    .warn{color:var(--warn)}
-    input, textarea{
-      background:#0b1120;color:var(--text);
-      border:1px solid var(--border);border-radius:10px;padding:10px;width:100%
-    }
-    input[type=file]{padding:8px;background:#0b1120;border:1px dashed var(--border)}
-    button{
-      padding:10px 16px;border-radius:10px;border:1px solid #0ea5b7;background:linear-gradient(135deg,#0ea5b7,#0369a1);color:#fff;cursor:pointer
-    }
-    button.secondary{
-      border-color:#334155;background:#0b1120;color:var(--text)
-    }
-    .hint{font-size:12px;color:var(--muted)}
-    pre{background:#0b1120;color:var(--text);padding:12px;border-radius:12px;overflow:auto}
-    .krow{display:flex;gap:10px;align-items:center;flex-wrap:wrap}
-    .pill{font-size:12px;border:1px solid var(--border);border-radius:999px;padding:4px 10px;background:#0b1120;color:var(--muted)}
-    .kv{display:grid;grid-template-columns:160px 1fr;gap:8px;align-items:center}
-    .thumbs{display:grid;grid-template-columns:repeat(4,1fr);gap:8px}
-    .thumb{width:100%;aspect-ratio:1/1;object-fit:cover;border-radius:10px;border:1px solid var(--border);background:#0b1120}
-    details{border:1px solid var(--border);border-radius:12px;padding:10px;background:#0b1120}
-    summary{cursor:pointer}
-    a{color:var(--accent)}
-  </style>
+  <link rel="stylesheet" href="{{ url_for('static', filename='kraig.css', v=css_version) }}">
 </head>
 <body>
   <div class="brand">
@@ -237,7 +348,7 @@ INDEX_HTML = """
           </div>
           <button type="submit" class="secondary">Get Price & Description</button>
         </div>
-        <input type="hidden" name="session_payload" value='{{ session_payload|tojson }}'>
+        <input type="hidden" name="sid" value="{{ sid }}">
       </form>
     </div>
 
@@ -296,7 +407,7 @@ INDEX_HTML = """
           <div>
             <div class="thumbs">
               {% for img in preview.images %}
-                <img class="thumb" src="data:{{ img.mimetype }};base64,{{ img.bytes }}" alt="{{ img.filename }}">
+                <img class="thumb" src="{{ url_for('upload_image', sid=sid, index=loop.index0) }}" alt="{{ img.filename }}">
               {% endfor %}
             </div>
             <p class="hint" style="margin-top:6px">{{ preview.images|length }} images selected.</p>
@@ -308,7 +419,7 @@ INDEX_HTML = """
       <div class="card soft" style="margin-top:12px">
         <h3>Post to Craigslist</h3>
         <form method="POST" action="/post_listing">
-          <input type="hidden" name="session_payload" value='{{ session_payload|tojson }}'>
+          <input type="hidden" name="sid" value="{{ sid }}">
           <button type="submit">Post Now</button>
         </form>
         <p class="hint">If the backend needs an email login link, you'll be prompted on the next page.</p>
@@ -346,26 +457,9 @@ JOB_HTML = """
 <head>
   <meta charset="utf-8"><meta name="viewport" content="width=device-width,initial-scale=1">
   <title>Kraig — Job {{ job_id }}</title>
-  <style>
-    :root{
-      --bg:#0b1021;--bg-2:#0d1330;--card:#121831;--text:#e5e7eb;--muted:#93a4bf;--border:#1f2a44;--accent:#00e5ff;
-    }
-    *{box-sizing:border-box}
-    body{
-      font-family:system-ui,-apple-system,Segoe UI,Roboto,Helvetica,Arial,sans-serif;
-      background:linear-gradient(180deg,var(--bg) 0%,var(--bg) 35%,var(--bg-2) 100%);
-      color:var(--text);max-width:980px;margin:32px auto;padding:0 16px
-    }
-    .brand{display:flex;align-items:center;gap:12px;margin-bottom:8px}
-    .logo{width:34px;height:34px;border-radius:8px;background:linear-gradient(135deg,#00e5ff,#60a5fa);display:inline-block;box-shadow:0 6px 24px rgba(0,229,255,.25)}
-    .card{border:1px solid var(--border);border-radius:14px;padding:16px;margin:12px 0;background:var(--card);box-shadow:0 1px 3px rgba(0,0,0,.25)}
-    .muted{color:var(--muted)}
-    pre{background:#0b1120;color:var(--text);padding:12px;border-radius:12px;max-height:420px;overflow:auto}
-    input, textarea{border:1px solid var(--border);border-radius:8px;padding:10px;width:100%;background:#0b1120;color:var(--text)}
-    button{padding:10px 16px;border-radius:10px;border:1px solid #0ea5b7;background:linear-gradient(135deg,#0ea5b7,#0369a1);color:#fff;cursor:pointer}
-  </style>
+  <link rel="stylesheet" href="{{ url_for('static', filename='kraig.css', v=css_version) }}">
 </head>
-<body>
+<body class="job">
   <div class="brand">
     <span class="logo"></span>
     <div>
@@ -411,6 +505,27 @@ JOB_HTML = """
 </html>
 """
 
+# Compiled once through Flask's Jinja environment (same filters/autoescape as
+# render_template_string, which would re-parse the template on every request)
+INDEX_TPL = app.jinja_env.from_string(INDEX_HTML)
+JOB_TPL = app.jinja_env.from_string(JOB_HTML)
+
+@functools.lru_cache(maxsize=32)
+def _render_index(script_root: str, error_msg: Optional[str]) -> str:
+    # script_root is unused here but keys the cache: the url_for() links embed it (e.g. behind a proxy)
+    return INDEX_TPL.render(categories=CATEGORIES, error_msg=error_msg)
+
+def _index_page(error_msg: Optional[str] = None) -> str:
+    """The bare form page (optionally with a fixed error message), rendered once per mount point and reused."""
+    return _render_index(request.script_root, error_msg)
+
+# Stylesheet is served from static/ with far-future caching; the content hash in the
+# URL changes whenever the file does, so browsers never keep a stale copy.
+app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 31536000
+app.jinja_env.globals["css_version"] = hashlib.sha256(
+    (ROOT_DIR / "static" / "kraig.css").read_bytes()
+).hexdigest()[:12]
+
 # ---------------------------------------------------------------------------------
 # Helpers: vision + JSON utils (from original scaffold)
 # ---------------------------------------------------------------------------------
@@ -427,50 +542,97 @@ class DebugEntry:
 def try_parse_json(raw_text: str):
     """Best-effort to pretty capture JSON text."""
     try:
-        return json.loads(raw_text)
+        return orjson.loads(raw_text)
     except Exception:
         return {"non_json_text": raw_text}
 
+# Fenced ```json ... ``` block in LLM output
+_FENCE_RE = re.compile(r"```(?:json)?\s*([\s\S]*?)\s*```", re.IGNORECASE)
+# The only characters that matter when matching braces
+_BRACE_TOKEN_RE = re.compile(r'[{}"\\]')
+
+def _json_object_spans(text: str):
+    """
+    Yield (start, end) of each top-level balanced {...} in a single pass.
+    Braces inside JSON strings are ignored; quotes outside an object are treated as prose.
+    """
+    depth = 0
+    start = -1
+    in_str = False
+    escaped_at = -1
+    for m in _BRACE_TOKEN_RE.finditer(text):
+        i = m.start()
+        ch = text[i]
+        if in_str:
+            if i == escaped_at:
+                continue
+            if ch == "\\":
+                escaped_at = i + 1
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = depth > 0
+        elif ch == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                yield start, i + 1
+
 def extract_json_fallback(text: str):
     """
     Robustly extract the first JSON object from an arbitrary string.
     - Tries fenced ```json blocks first.
-    - Then scans for the first balanced {...} and parses it.
+    - Then parses the first balanced top-level {...} that is valid JSON (single pass).
     Returns dict or {}.
     """
     if not text:
         return {}
-    fence_match = re.search(r"```(?:json)?\s*([\s\S]*?)\s*```", text, re.IGNORECASE)
+    fence_match = _FENCE_RE.search(text)
     if fence_match:
         candidate = fence_match.group(1).strip()
         try:
-            return json.loads(candidate)
+            return orjson.loads(candidate)
         except Exception:
             text = candidate
-    starts = [m.start() for m in re.finditer(r"\{", text)]
-    for si in starts:
-        depth = 0
-        for ei in range(si, len(text)):
-            ch = text[ei]
-            if ch == "{":
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0:
-                    candidate = text[si:ei+1]
-                    try:
-                        return json.loads(candidate)
-                    except Exception:
-                        break
+    for si, ei in _json_object_spans(text):
+        try:
+            return orjson.loads(text[si:ei])
+        except Exception:
+            continue
     return {}
 
+# The vision endpoint downsamples anyway; larger photos only cost upload time
+VISION_MAX_SIDE = 1024
+
+def downscale_for_vision(data: bytes, mime: str) -> Tuple[str, str]:
+    """Return (base64, mimetype) of the raw photo shrunk to VISION_MAX_SIDE as JPEG q=85.
+
+    The photo is encoded as-is if Pillow is missing, it is already small enough,
+    or it can't be decoded.
+    """
+    if Image is not None:
+        try:
+            img = Image.open(io.BytesIO(data))
+            if max(img.size) > VISION_MAX_SIDE:
+                img = ImageOps.exif_transpose(img)
+                img.thumbnail((VISION_MAX_SIDE, VISION_MAX_SIDE), Image.LANCZOS)
+                buf = io.BytesIO()
+                img.convert("RGB").save(buf, "JPEG", quality=85, optimize=True)
+                data, mime = buf.getvalue(), "image/jpeg"
+        except Exception:
+            pass
+    return b64codec.b64encode(data).decode("ascii"), mime
+
 # ---------------------------------------------------------------------------------
 # Vision: identify product (kept from original)
 # ---------------------------------------------------------------------------------
 
-def ask_o3_for_top3(image_bytes: bytes, filename: str, mime: str, debug_list):
+def ask_o3_for_top3(image_b64: str, filename: str, mime: str, debug_list):
     """
-    Send ONE image to vision model and ask for top-3 JSON.
+    Send ONE image (already downscaled and base64-encoded) to vision model and ask for top-3 JSON.
     First tries gpt-4o (vision), then falls back to gpt-4o-mini.
     Append structured debug info to debug_list.
     """
@@ -504,8 +666,9 @@ def ask_o3_for_top3(image_bytes: bytes, filename: str, mime: str, debug_list):
     )
     prompt = "Identify the item in this photo. Return your top 3 distinct guesses with confidences."
 
-    image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-    image_url = f"data:{mime or 'image/jpeg'};base64,{image_base64}"
+    image_url = f"data:{mime or 'image/jpeg'};base64,{image_b64}"
+    # Decoded size, for the debug panel
+    image_size = len(image_b64) * 3 // 4 - image_b64[-2:].count("=")
 
     debug_list.append(DebugEntry(
         "Vision request (gpt-4o)",
@@ -514,7 +677,7 @@ def ask_o3_for_top3(image_bytes: bytes, filename: str, mime: str, debug_list):
             "schema": schema,
             "system_prompt_excerpt": system[:240],
             "user_prompt": prompt,
-            "image_meta": {"filename": filename or "upload", "mimetype": mime, "bytes": len(image_bytes)},
+            "image_meta": {"filename": filename or "upload", "mimetype": mime, "bytes": image_size},
         }
     ))
 
@@ -535,7 +698,7 @@ def ask_o3_for_top3(image_bytes: bytes, filename: str, mime: str, debug_list):
             )
             raw = resp.choices[0].message.content
             debug_list.append(DebugEntry("Vision raw JSON (gpt-4o)", {"attempt": attempt + 1, "raw": try_parse_json(raw)}))
-            data = json.loads(raw)
+            data = orjson.loads(raw)
             return data.get("guesses", [])
         except Exception as e:
             debug_list.append(DebugEntry("Vision error (gpt-4o)", {"attempt": attempt + 1, "error": repr(e)}))
@@ -552,64 +715,273 @@ def ask_o3_for_top3(image_bytes: bytes, filename: str, mime: str, debug_list):
             temperature=0.0
         )
         raw = resp.choices[0].message.content
-        data = json.loads(raw)
+        data = orjson.loads(raw)
         return data.get("guesses", [])
     except Exception:
         return []
 
-def classify_category_with_llm(label: str, debug_entries):
+# One guesses array per image, in upload order. Strict structured outputs don't take
+# length/range limits, so /analyze trims, pads and clamps the result.
+_BATCH_VISION_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "image_guesses",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "images": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "guesses": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "label": {"type": "string"},
+                                        "confidence": {"type": "number"}
+                                    },
+                                    "required": ["label", "confidence"],
+                                    "additionalProperties": False
+                                }
+                            }
+                        },
+                        "required": ["guesses"],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["images"],
+            "additionalProperties": False
+        }
+    }
+}
+
+def ask_o3_for_top3_batch(images: List[Tuple[str, str, str]], debug_list) -> List[List[Dict[str, Any]]]:
     """
-    Ask ChatGPT (Responses API) to choose ONE category from CATEGORIES for the given label.
-    Returns a string category (always one of CATEGORIES), with a few keyword fallbacks.
-    Ex. Oculus Quest = "Electronics"
+    Send ALL images (downscaled base64, filename, mimetype) in one gpt-4o vision request and get
+    top-3 guesses per image. The photos usually show the same item from different
+    angles, so the model also gets cross-image context.
+    Images the batch doesn't answer for fall back to parallel per-image ask_o3_for_top3 calls.
     """
+    n = len(images)
     system = (
-        "You are a marketplace category classifier for Craigslist.\n"
-        "Given only an item name, choose the SINGLE closest category from the provided list.\n"
-        "Return JSON only: {\"category\":\"<one>\"}."
+        "You identify retail products from photos.\n"
+        f"You get {n} images, numbered in order. For EACH image return its top 3 distinct guesses.\n"
+        "Return JSON: {images: [{guesses: [{label, confidence} x3]} x" + str(n) + "]} in image order.\n"
+        "Label must be 'Brand Model Variant' if possible (e.g., 'Meta Quest Pro').\n"
+        "Confidence is 0..1. If unsure, include best-guess labels with lower confidence."
+    )
+    content: List[Dict[str, Any]] = [{"type": "text", "text": f"Identify the item in each of these {n} photos."}]
+    for i, (image_b64, filename, mime) in enumerate(images):
+        content.append({"type": "text", "text": f"Image {i + 1}:"})
+        content.append({"type": "image_url", "image_url": {"url": f"data:{mime or 'image/jpeg'};base64,{image_b64}"}})
+
+    debug_list.append(DebugEntry(
+        "Vision batch request (gpt-4o)",
+        {
+            "model": "gpt-4o",
+            "system_prompt_excerpt": system[:240],
+            "images": [{"filename": fn or "upload", "mimetype": mt} for _, fn, mt in images],
+        }
+    ))
+
+    results: List[List[Dict[str, Any]]] = [[] for _ in images]
+    for attempt in range(2):
+        try:
+            resp = client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": content}
+                ],
+                response_format=_BATCH_VISION_FORMAT,
+                temperature=0.0
+            )
+            raw = resp.choices[0].message.content
+            debug_list.append(DebugEntry("Vision batch raw JSON (gpt-4o)", {"attempt": attempt + 1, "raw": try_parse_json(raw)}))
+            for i, entry in enumerate((orjson.loads(raw).get("images") or [])[:n]):
+                results[i] = (entry or {}).get("guesses") or []
+            break
+        except Exception as e:
+            debug_list.append(DebugEntry("Vision batch error (gpt-4o)", {"attempt": attempt + 1, "error": repr(e)}))
+            if attempt == 0:
+                time.sleep(0.8)
+
+    # Per-image fallback, in parallel, for any image the batch left empty; debug output
+    # is merged in image order
+    missing = [i for i in range(n) if not results[i]]
+    if missing:
+        image_debug: List[List[DebugEntry]] = [[] for _ in missing]
+        with ThreadPoolExecutor(max_workers=len(missing)) as ex:
+            futures = [ex.submit(ask_o3_for_top3, *images[i], dbg) for i, dbg in zip(missing, image_debug)]
+            for i, fut in zip(missing, futures):
+                results[i] = fut.result() or []
+        for dbg in image_debug:
+            debug_list.extend(dbg)
+    return results
+
+# Structured output: the model can only answer with one of CATEGORIES
+_CATEGORY_FORMAT = {
+    "type": "json_schema",
+    "name": "category",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {"category": {"type": "string", "enum": CATEGORIES}},
+        "required": ["category"],
+        "additionalProperties": False,
+    },
+}
+
+@functools.lru_cache(maxsize=1024)
+def _classify_category_cached(key: str) -> str:
+    """Ask the model for the category of a canonicalized label; '' if it gave none. Raises on API errors (not cached)."""
+    resp = client.responses.create(
+        model="gpt-4.1-mini",
+        input=[
+            {"role": "system", "content": "Pick the closest Craigslist for-sale category for the item."},
+            {"role": "user", "content": key}
+        ],
+        text={"format": _CATEGORY_FORMAT},
+        temperature=0
     )
-    cat_list = "\n".join(f"- {c}" for c in CATEGORIES)
-    user = f"Item name: {label}\n\nChoose a category from this list:\n{cat_list}\n\nReturn JSON only."
+    data = extract_json_fallback(getattr(resp, "output_text", None) or "")
+    return _CAT_LOWER.get((data.get("category") or "").strip().lower(), "")
 
+def classify_category_with_llm(label: str, debug_entries):
+    """
+    Ask ChatGPT (Responses API, schema-constrained) to choose ONE category from CATEGORIES for the given label.
+    Returns a string category (always one of CATEGORIES), with a few keyword fallbacks.
+    Results are cached per canonical label.
+    Ex. Oculus Quest = "Electronics"
+    """
     try:
-        resp = client.responses.create(
-            model="gpt-4.1-mini",
-            input=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user}
-            ],
-            temperature=0
-        )
-        raw_text = getattr(resp, "output_text", None)
-        data = extract_json_fallback(raw_text or "")
-        cat = (data.get("category") or "").strip().lower()
-        for c in CATEGORIES:
-            if c.lower() == cat:
-                return c
+        cat = _classify_category_cached(canonicalize(label))
+        if cat:
+            return cat
     except Exception as e:
         debug_entries.append(DebugEntry("Category classification error", {"error": repr(e)}))
 
     # Simple heuristics
     l = (label or "").lower()
-    def has(*words): return any(w in l for w in words)
-    if has("chair","sofa","table","dresser","stool","couch","desk","bed","cabinet"): return "furniture"
-    if has("iphone","samsung","pixel","android","smartphone","cell"): return "cell phones"
-    if has("laptop","macbook","surface","notebook"): return "computers"
-    if has("camera","lens","dslr","mirrorless","tripod"): return "photo/video"
-    if has("guitar","piano","keyboard","drum","synth"): return "musical instruments"
-    if has("ps5","xbox","nintendo","switch","gaming"): return "video gaming"
-    if has("microwave","fridge","refrigerator","washer","dryer","oven","dishwasher"): return "appliances"
-    if has("hammer","drill","saw","wrench","tool"): return "tools"
-    if has("speaker","headphones","tv","monitor","tablet","smartwatch"): return "electronics"
+    for words, category in _CATEGORY_KEYWORDS:
+        if any(w in l for w in words):
+            return category
     return "general for sale"
 
+# Pricing results per canonical label: (stored_at, info). Oldest entries are evicted
+# first and entries expire after PRICE_CACHE_TTL, since market prices drift.
+PRICE_CACHE_MAX = 2048
+PRICE_CACHE_TTL = 6 * 3600
+_price_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_price_cache_lock = threading.Lock()
+
+def _price_and_describe(label: str) -> Dict[str, Any]:
+    """
+    Ask OpenAI for market price, selling price, description and sources for a product label.
+    Cached per canonical label; raises on API errors, and neither those nor answers
+    without a price or description are cached.
+    """
+    key = canonicalize(label)
+    now = time.monotonic()
+    with _price_cache_lock:
+        hit = _price_cache.get(key)
+        if hit and now - hit[0] < PRICE_CACHE_TTL:
+            _price_cache.move_to_end(key)
+            return dict(hit[1])
+
+    price_system = (
+        "You are a Craigslist listing generator.\n"
+        "TASKS:\n"
+        "1) Estimate a reasonable US market price for the given product name (used-good condition) and include a couple of sources.\n"
+        "2) Write a short Craigslist-style description (2-4 sentences).\n"
+        "Return JSON only with keys: {\"label\":string,\"market_price\":number,\"description\":string,\"sources\":[{\"title\":string,\"url\":string}]}.\n"
+    )
+    price_user = f"Product: {label}. Return strict JSON only."
+
+    resp = client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": price_system},
+            {"role": "user", "content": price_user}
+        ],
+        response_format={"type": "json_object"},
+        temperature=0
+    )
+    raw = resp.choices[0].message.content
+    data = extract_json_fallback(raw or "") or {}
+
+    lbl = str(data.get("label") or label)
+    mk = data.get("market_price")
+    try:
+        market_price_num = float(mk)
+    except Exception:
+        market_price_num = None
+
+    descr = str(data.get("description") or "").strip()
+    sources = data.get("sources") or []
+    clean_sources = []
+    for s in sources[:5]:
+        try:
+            title = str(s.get("title") or "")[:140]
+            url = str(s.get("url") or "")
+            if title and url:
+                clean_sources.append({"title": title, "url": url})
+        except Exception:
+            continue
+
+    selling_price = "N/A"
+    market_price_label = "N/A"
+    if market_price_num is not None:
+        selling_price = f"${int(market_price_num * 0.8)}"
+        market_price_label = f"${market_price_num:.2f}".rstrip('0').rstrip('.')
+
+    info = {
+        "label": lbl,
+        "market_price": market_price_label,
+        "selling_price": selling_price,
+        "description": descr if descr else "Could not fetch details.",
+        "sources": clean_sources
+    }
+    if market_price_num is None and not descr:
+        # Unparseable answer: return the fallback but let the next request retry
+        return info
+    with _price_cache_lock:
+        _price_cache[key] = (now, info)
+        _price_cache.move_to_end(key)
+        while len(_price_cache) > PRICE_CACHE_MAX:
+            _price_cache.popitem(last=False)
+    return dict(info)
+
+# Background warm-up of the pricing/category caches for the likely choice
+SPECULATION_WAIT = 60
+_speculation_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="kraig-speculate")
+
+def _speculate_listing(label: str) -> None:
+    """Price and categorize label ahead of /choose; results land in the caches."""
+    info = _price_and_describe(label)
+    _classify_category_cached(canonicalize(info["label"]))
+
 # ---------------------------------------------------------------------------------
 # Web routes: analyze -> choose (pricing/description/category) -> post_listing
 # ---------------------------------------------------------------------------------
 
+# Fire-and-forget disk writes (listing records) that the response doesn't wait for
+_io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="kraig-io")
+
+def _write_meta_json(listing_dir: Path, record: Dict[str, Any]) -> None:
+    try:
+        listing_dir.mkdir(parents=True, exist_ok=True)
+        (listing_dir / "meta.json").write_bytes(orjson.dumps(record, option=orjson.OPT_INDENT_2))
+    except Exception:
+        pass
+
 @app.route("/", methods=["GET"])
 def index():
-    return render_template_string(INDEX_HTML, categories=CATEGORIES)
+    return _index_page()
 
 @app.route("/analyze", methods=["POST"])
 def analyze():
@@ -617,33 +989,29 @@ def analyze():
     email = (request.form.get("email") or "").strip()
     address = (request.form.get("address") or "").strip()
     if not email or not address:
-        return render_template_string(
-            INDEX_HTML,
-            error_msg="Please provide email and full address.",
-            combined=None, per_image=None, session_payload=None, debug_entries=[],
-            categories=CATEGORIES
-        )
+        return _index_page("Please provide email and full address.")
 
     images = request.files.getlist("images")
     if not images or len(images) != 4:
-        return render_template_string(
-            INDEX_HTML,
-            error_msg="Please select exactly 4 images in a single selection.",
-            combined=None, per_image=None, session_payload=None, debug_entries=[],
-            categories=CATEGORIES
-        )
+        return _index_page("Please select exactly 4 images in a single selection.")
+
+    # Read every upload up front (request.files isn't thread-safe). The session keeps the
+    # raw bytes, which go to disk and the thumbnails as-is; base64 is only built once, from
+    # the downscaled photo, for the vision data URLs and dropped after the request.
+    session_images: List[Dict[str, Any]] = [
+        {"filename": f.filename, "mimetype": f.mimetype, "data": f.read()} for f in images
+    ]
+    uploads = []
+    for img in session_images:
+        image_b64, mime = downscale_for_vision(img["data"], img["mimetype"])
+        uploads.append((image_b64, img["filename"], mime))
+
+    # One vision request for all photos (per-image calls only as a fallback)
+    all_guesses = ask_o3_for_top3_batch(uploads, debug_entries)
 
-    # Store images for later saving
-    session_images: List[Dict[str, Any]] = []
     per_image: List[List[Dict[str, Any]]] = []
-    for f in images:
-        img_bytes = f.read()  # in-memory only
-        session_images.append({
-            "filename": f.filename,
-            "mimetype": f.mimetype,
-            "bytes": base64.b64encode(img_bytes).decode("utf-8")
-        })
-        guesses = ask_o3_for_top3(img_bytes, f.filename, f.mimetype, debug_entries) or []
+    for guesses in all_guesses:
+        guesses = guesses or []
         clean: List[Dict[str, Any]] = []
         for g in guesses[:3]:
             try:
@@ -659,27 +1027,34 @@ def analyze():
         per_image.append(clean)
 
     # Combine: sum normalized weights across images per canonical label
-    weights: Dict[str, float] = {}
+    weights: Dict[str, float] = defaultdict(float)
     label_map: Dict[str, str] = {}
     for guesses in per_image:
         s = sum(g["confidence"] for g in guesses) or 1.0
         for g in guesses:
-            w = g["confidence"] / s
             key = canonicalize(g["label"])
-            weights[key] = weights.get(key, 0.0) + w
-            label_map.setdefault(key, g["label"])
+            weights[key] += g["confidence"] / s
+            if key not in label_map:
+                label_map[key] = g["label"]
+
+    combined = heapq.nlargest(
+        3, ({"label": label_map[k], "weight": v} for k, v in weights.items()), key=itemgetter("weight")
+    )
 
-    combined = [{"label": label_map[k], "weight": v} for k, v in weights.items()]
-    combined.sort(key=lambda x: x["weight"], reverse=True)
-    combined = combined[:3]
+    # While the user picks a guess, price + categorize the top one in the background;
+    # /choose waits on it (and then hits the caches) if the user keeps that guess
+    speculative = None
+    if combined:
+        top = combined[0]["label"]
+        speculative = (canonicalize(top), _speculation_pool.submit(_speculate_listing, top))
 
-    session_payload = {"per_image": per_image, "combined": combined, "images": session_images, "email": email, "address": address}
+    sid = uuid.uuid4().hex
+    _session_put(sid, {"per_image": per_image, "combined": combined, "images": session_images, "email": email, "address": address, "speculative": speculative})
 
-    return render_template_string(
-        INDEX_HTML,
+    return INDEX_TPL.render(
         combined=combined,
         per_image=per_image,
-        session_payload=session_payload,
+        sid=sid,
         debug_entries=debug_entries,
         categories=CATEGORIES
     )
@@ -692,103 +1067,52 @@ def choose():
     other = (request.form.get("other_text") or "").strip()
     label = other if (choice == "__other__" and other) else (choice or "Unknown")
 
-    listing_id = str(uuid.uuid4())[:8]
-
-    # Ask OpenAI for price + description + sources (web-side)
-    price_system = (
-        "You are a Craigslist listing generator.\n"
-        "TASKS:\n"
-        "1) Estimate a reasonable US market price for the given product name (used-good condition) and include a couple of sources.\n"
-        "2) Write a short Craigslist-style description (2-4 sentences).\n"
-        "Return JSON only with keys: {\"label\":string,\"market_price\":number,\"description\":string,\"sources\":[{\"title\":string,\"url\":string}]}.\n"
-    )
-    price_user = f"Product: {label}. Return strict JSON only."
-
-    result: Dict[str, Any] = {}
-    try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": price_system},
-                {"role": "user", "content": price_user}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0
-        )
-        raw = resp.choices[0].message.content
-        data = extract_json_fallback(raw or "") or {}
+    listing_id = secrets.token_hex(4)
+    sid = (request.form.get("sid") or "").strip()
+    prev = _session_get(sid) if sid else {}
 
-        lbl = str(data.get("label") or label)
-        mk = data.get("market_price")
+    # If /analyze already started pricing this label, let it finish so the lookups
+    # below are cache hits rather than duplicate calls
+    speculative = prev.get("speculative")
+    if speculative and speculative[0] == canonicalize(label):
         try:
-            market_price_num = float(mk)
+            speculative[1].result(timeout=SPECULATION_WAIT)
         except Exception:
-            market_price_num = None
-
-        descr = str(data.get("description") or "").strip()
-        sources = data.get("sources") or []
-        clean_sources = []
-        for s in sources[:5]:
-            try:
-                title = str(s.get("title") or "")[:140]
-                url = str(s.get("url") or "")
-                if title and url:
-                    clean_sources.append({"title": title, "url": url})
-            except Exception:
-                continue
-
-        selling_price = "N/A"
-        market_price_label = "N/A"
-        if market_price_num is not None:
-            selling_price = f"${int(market_price_num * 0.8)}"
-            market_price_label = f"${market_price_num:.2f}".rstrip('0').rstrip('.')
-
-        result = {
-            "label": lbl,
-            "listing_id": listing_id,
-            "market_price": market_price_label,
-            "selling_price": selling_price,
-            "description": descr if descr else "Could not fetch details.",
-            "sources": clean_sources
-        }
+            pass
 
-    except Exception as e:
+    # Ask OpenAI for price + description + sources (web-side; cached per product)
+    try:
+        result = _price_and_describe(label)
+    except Exception:
         result = {
             "label": label,
-            "listing_id": listing_id,
             "market_price": "N/A",
             "selling_price": "N/A",
             "description": "Could not fetch details.",
             "sources": []
         }
+    result["listing_id"] = listing_id
 
     # Category classification
     category = classify_category_with_llm(result["label"], debug_entries)
     result["category"] = category
 
-    # Bundle session data (persist image bytes + user info)
-    try:
-        prev = json.loads(request.form.get("session_payload", "{}")) or {}
-    except Exception:
-        prev = {}
+    # Bundle session data (persist image bytes + user info) under the same sid
     session_data = {
         "result": result,
         "images": prev.get("images", []),
         "email": prev.get("email", ""),
         "address": prev.get("address", "")
     }
+    sid = sid or uuid.uuid4().hex
+    _session_put(sid, session_data)
 
     # Build a Posting Preview (everything that will be sent to backend)
     email = session_data["email"]
     address = session_data["address"]
-    city, postal = _parse_city_postal(address)
+    city, postal = parse_city_postal(address)
     condition = "like new"  # default used by backend if not overridden
-    # Convert "$123" -> 123 as int, fallback to 0
-    price_str = str(result.get("selling_price") or "").replace("$", "").strip()
-    try:
-        price_int = int(float(price_str)) if price_str else 0
-    except Exception:
-        price_int = 0
+    price_int = _parse_price(result.get("selling_price"))
     preview = {
         "email": email,
         "address": address,
@@ -802,98 +1126,286 @@ def choose():
         "images": session_data["images"],
     }
 
-    # Save a listing record (optional)
-    try:
-        listing_dir = LISTINGS_DIR / listing_id
-        listing_dir.mkdir(parents=True, exist_ok=True)
-        (listing_dir / "meta.json").write_text(json.dumps({
-            "created_at": datetime.utcnow().isoformat() + "Z",
-            "result": result,
-            "email": email,
-            "address": address,
-            "preview": preview
-        }, indent=2), encoding="utf-8")
-    except Exception:
-        pass
+    # Save a listing record (optional), off the request thread
+    _io_pool.submit(_write_meta_json, LISTINGS_DIR / listing_id, {
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "result": result,
+        "email": email,
+        "address": address,
+        # Photo bytes aren't JSON; record which files were attached
+        "preview": {**preview, "images": [
+            {"filename": img.get("filename"), "mimetype": img.get("mimetype")} for img in preview["images"]
+        ]}
+    })
 
-    return render_template_string(
-        INDEX_HTML,
+    return INDEX_TPL.render(
         result=result,
         combined=None,
         per_image=None,
-        session_payload=session_data,
+        sid=sid,
         preview=preview,
         debug_entries=debug_entries,
         categories=CATEGORIES
     )
 
+# Upload types served back as-is for the preview thumbnails
+THUMBNAIL_MIMETYPES = frozenset({
+    "image/jpeg", "image/png", "image/webp", "image/gif", "image/heic", "image/heif",
+})
+
+@app.route("/uploads/<sid>/<int:index>", methods=["GET"])
+def upload_image(sid: str, index: int):
+    """Serve one uploaded photo from the session (preview thumbnails), instead of inlining it as a data: URL."""
+    images = _session_get(sid).get("images") or []
+    if not 0 <= index < len(images):
+        return Response("Not found", status=404, mimetype="text/plain")
+    img = images[index] or {}
+    # The mimetype comes from the client; anything but a known image type (e.g. text/html,
+    # image/svg+xml) would run as a page on our origin, so it is served as opaque bytes
+    mime = img.get("mimetype")
+    return Response(
+        img.get("data") or b"",
+        mimetype=mime if mime in THUMBNAIL_MIMETYPES else "application/octet-stream",
+        headers={"Cache-Control": "private, max-age=3600", "X-Content-Type-Options": "nosniff"},
+    )
+
 # ---------------------------------------------------------------------------------
 # Backend orchestration (launch Agent + SSE + magic link submission)
 # ---------------------------------------------------------------------------------
 
-def _parse_city_postal(address: str) -> Tuple[str, str]:
+def _parse_price(value: Any) -> int:
+    """Whole-dollar price from e.g. "$1,200" or "49.99"; 0 if it can't be parsed."""
+    s = str(value or "").strip().lstrip("$").replace(",", "")
+    # Common case: plain digits, no float parse or exception
+    if s.isascii() and s.isdigit():
+        return int(s)
     try:
-        m = re.search(r",\s*([A-Za-z .'-]+),\s*[A-Z]{2}\s*(\d{5})", address)
-        if m:
-            return m.group(1).strip(), m.group(2).strip()
-        m2 = re.search(r"(\d{5})(?:-\d{4})?$", address)
-        postal = m2.group(1) if m2 else ""
-        parts = [p.strip() for p in address.split(",") if p.strip()]
-        city = parts[-2] if len(parts) >= 2 else (parts[0] if parts else "")
-        return city, postal
-    except Exception:
-        return "", ""
+        return int(float(s)) if s else 0
+    except (ValueError, OverflowError):
+        return 0
+
+# Process environment forwarded to every agent (fixed for the life of the process)
+_AGENT_BASE_ENV: Dict[str, str] = {
+    k: v for k in ["PATH","HOME","SHELL","LANG","LC_ALL","SSL_CERT_FILE","REQUESTS_CA_BUNDLE","PYTHONPATH"]
+    if (v := os.environ.get(k))
+}
+_AGENT_BASE_ENV["PYTHONUNBUFFERED"] = "1"
+
+@functools.lru_cache(maxsize=4)
+def _agent_dotenv(path: str, mtime_ns: int) -> Tuple[Tuple[str, str], ...]:
+    """Parsed agent .env, re-read only when the file's mtime changes."""
+    return tuple((k, v) for k, v in (dotenv_values(path) or {}).items() if isinstance(v, str))
 
 def _load_agent_env() -> Dict[str, str]:
-    env: Dict[str, str] = {}
-    for k in ["PATH","HOME","SHELL","LANG","LC_ALL","SSL_CERT_FILE","REQUESTS_CA_BUNDLE","PYTHONPATH"]:
-        v = os.environ.get(k)
-        if v:
-            env[k] = v
-    env["PYTHONUNBUFFERED"] = "1"
-    vals = dotenv_values(AGENT_ENV_FILE) if AGENT_ENV_FILE and Path(AGENT_ENV_FILE).exists() else {}
-    for k, v in (vals or {}).items():
-        if isinstance(v, str):
-            env[k] = v
+    env = dict(_AGENT_BASE_ENV)
+    if AGENT_ENV_FILE:
+        try:
+            mtime_ns = os.stat(AGENT_ENV_FILE).st_mtime_ns
+        except OSError:
+            return env
+        env.update(_agent_dotenv(AGENT_ENV_FILE, mtime_ns))
     return env
 
+# ASCII translation table: keep letters, digits and '._-', delete everything else
+_FILENAME_TABLE = {c: None for c in range(128) if not (chr(c).isalnum() or chr(c) in "._-")}
+
+def _safe_filename(name: str) -> str:
+    """Filesystem-safe upload name (at most 64 chars); may be empty."""
+    if name.isascii():
+        return name.translate(_FILENAME_TABLE)[:64]
+    return "".join(c for c in name if c.isalnum() or c in "._-")[:64]
+
 def _save_images_for_job(job_dir: Path, session_images: List[Dict[str, Any]]) -> List[str]:
-    paths: List[str] = []
     img_dir = job_dir / "images"
     img_dir.mkdir(parents=True, exist_ok=True)
+    # Photos are written concurrently on the I/O pool (file writes release the GIL).
+    # The same photo selected twice is written once and its path reused; different photos
+    # with the same upload name (iOS sends every photo as image.jpg) get unique file names.
+    pending: Dict[bytes, Tuple[Any, str]] = {}
+    order: List[bytes] = []
+    used_names = set()
     for i, img in enumerate(session_images or []):
         try:
-            b64 = (img or {}).get("bytes", "")
-            if not isinstance(b64, str):
+            img = img or {}
+            data = img.get("data")
+            if not isinstance(data, bytes) or not data:
                 continue
-            data = base64.b64decode(b64)
-            name = (img or {}).get("filename") or f"image_{i+1}.jpg"
-            safe = "".join(c for c in name if c.isalnum() or c in "._-")[:64] or f"image_{i+1}.jpg"
-            p = img_dir / safe
-            with open(p, "wb") as f:
-                f.write(data)
-            paths.append(str(p.resolve()))
+            digest = hashlib.blake2b(data, digest_size=16).digest()
+            if digest not in pending:
+                name = img.get("filename") or f"image_{i+1}.jpg"
+                safe = _safe_filename(name) or f"image_{i+1}.jpg"
+                if safe in used_names:
+                    stem, suffix = os.path.splitext(safe)
+                    n = 2
+                    while f"{stem}_{n}{suffix}" in used_names:
+                        n += 1
+                    safe = f"{stem}_{n}{suffix}"
+                used_names.add(safe)
+                p = img_dir / safe
+                pending[digest] = (_io_pool.submit(p.write_bytes, data), str(p.resolve()))
+            order.append(digest)
         except Exception:
             continue
+    paths: List[str] = []
+    for digest in order:
+        future, path = pending[digest]
+        try:
+            future.result()
+        except Exception:
+            continue
+        paths.append(path)
     return paths
 
-def _start_agent(job_id: str, payload: Dict[str, Any]) -> None:
-    job = _job_registry[job_id]
-    q: "queue.Queue[str]" = job["queue"]
+def _sse_frame(kind: str, value: str) -> bytes:
+    """One SSE `data:` frame as bytes (Flask streams bytes as-is, no re-encode)."""
+    return b"data: " + orjson.dumps({"type": kind, "value": value}) + b"\n\n"
+
+_DONE_FRAME = _sse_frame("done", "done")
+# SSE comment: ignored by EventSource, keeps proxies from idling out
+_PING_FRAME = b": ping\n\n"
+
+class _JobFeed:
+    """
+    Fan-out of one job's log to every open event stream. Each line is serialised into
+    an SSE frame once and the same bytes go to all subscribers; frames are also kept so
+    a stream that connects (or reconnects) late replays the log from the start.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frames: List[bytes] = []
+        self._subscribers: List["queue.SimpleQueue[bytes]"] = []
+
+    def _push(self, frame: bytes) -> None:
+        with self._lock:
+            self._frames.append(frame)
+            for sq in self._subscribers:
+                sq.put(frame)
+
+    def publish(self, line: str) -> None:
+        self._push(_sse_frame("line", line))
+
+    def close(self) -> None:
+        self._push(_DONE_FRAME)
+
+    def ping(self) -> None:
+        """Send a keepalive to the open streams only (not kept for replay)."""
+        with self._lock:
+            for sq in self._subscribers:
+                sq.put(_PING_FRAME)
+
+    def subscribe(self) -> "queue.SimpleQueue[bytes]":
+        sq: "queue.SimpleQueue[bytes]" = queue.SimpleQueue()
+        with self._lock:
+            for frame in self._frames:
+                sq.put(frame)
+            self._subscribers.append(sq)
+        return sq
+
+    def unsubscribe(self, sq: "queue.SimpleQueue[bytes]") -> None:
+        with self._lock:
+            try:
+                self._subscribers.remove(sq)
+            except ValueError:
+                pass
+
+# Agent stdout: read 64 KiB per syscall and ask Linux for a 1 MiB pipe (default 64 KiB)
+# so a chatty agent doesn't block on a full pipe between pump wake-ups
+AGENT_READ_CHUNK = 1 << 16
+AGENT_PIPE_SIZE = 1 << 20
+
+class _LogPump:
+    """
+    One background thread that multiplexes every running agent's stdout with `selectors`
+    and feeds complete lines into each job's queue, instead of one blocking reader thread
+    per job. Jobs are handed over through a wake-up pipe so select() picks them up at once.
+    The pump never waits on a process: at EOF it only flushes and sets the job's `drained`
+    event; the job's own pool thread reports the exit code.
+    """
+
+    def __init__(self):
+        self._sel = selectors.DefaultSelector()
+        self._pending: List[Tuple[Any, _JobFeed, threading.Event]] = []
+        self._lock = threading.Lock()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._sel.register(self._wake_r, selectors.EVENT_READ, None)
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, proc: subprocess.Popen, feed: _JobFeed) -> threading.Event:
+        """Start forwarding proc's output; the returned event is set once stdout hits EOF."""
+        drained = threading.Event()
+        with self._lock:
+            self._pending.append((proc, feed, drained))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="agent-log-pump", daemon=True)
+                self._thread.start()
+        os.write(self._wake_w, b"\0")
+        return drained
+
+    def _register_pending(self) -> None:
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for proc, feed, drained in pending:
+            fd = proc.stdout.fileno()
+            os.set_blocking(fd, False)
+            self._sel.register(fd, selectors.EVENT_READ, (proc, feed, drained, bytearray()))
+
+    def _run(self) -> None:
+        while True:
+            for key, _ in self._sel.select():
+                if key.data is None:
+                    self._register_pending()
+                    continue
+                proc, feed, drained, buf = key.data
+                try:
+                    chunk = os.read(key.fd, AGENT_READ_CHUNK)
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    chunk = b""
+                if chunk:
+                    buf += chunk
+                    *lines, rest = buf.split(b"\n")
+                    buf[:] = rest
+                    for line in lines:
+                        feed.publish(line.decode("utf-8", "replace").rstrip("\r"))
+                    continue
+                # EOF: flush any unterminated tail; the job thread reports the exit
+                self._sel.unregister(key.fd)
+                if buf:
+                    feed.publish(buf.decode("utf-8", "replace").rstrip("\r"))
+                proc.stdout.close()
+                drained.set()
+
+
+# Pipes can't be selected on Windows; there each job keeps its own blocking reader
+_log_pump: Optional[_LogPump] = _LogPump() if os.name != "nt" else None
+
+# Run the agent through uv when it's installed; decided once instead of probing per job
+_AGENT_CMD = ["uv", "run", "script.py"] if shutil.which("uv") else ["python", "script.py"]
+
+def _start_agent(job_id: str, payload: Dict[str, Any]) -> Optional[threading.Event]:
+    """Launch the agent and start forwarding its output to the job's feed.
+
+    Returns an event that is set once the output is fully forwarded, or None if the
+    agent couldn't be started (already reported and the feed closed).
+    """
+    feed = _jobs.feed(job_id)
 
     result = payload.get("result", {}) or {}
     email = payload.get("email", "") or ""
     address = payload.get("address", "") or ""
-    images = payload.get("images", []) or []
 
 
     title = str(result.get("label") or "For sale")
     category = str(result.get("category") or "general for sale")
-    selling = str(result.get("selling_price") or "").replace("$","").strip()
-    try:
-        price = str(int(float(selling))) if selling else "0"
-    except Exception:
-        price = "0"
+    price = str(_parse_price(result.get("selling_price")))
     description = str(result.get("description") or "Great condition. Pickup only.")
 
     env = _load_agent_env()
@@ -904,17 +1416,12 @@ def _start_agent(job_id: str, payload: Dict[str, Any]) -> None:
     env["PRICE"] = price
     env["ADDRESS"] = address
     env["DESCRIPTION"] = description
-    env["IMAGES"] = ",".join(images)
+    env["MANIFEST"] = str(payload.get("manifest") or "")
     env["HEADLESS"] = env.get("HEADLESS", "false")
     env["HIGHLIGHT"] = env.get("HIGHLIGHT", "true")
-    env["MAGIC_LINK_FILE"] = str(job["magic_link_file"])
+    env["MAGIC_LINK_FILE"] = str(_jobs.magic_link_file(job_id))
 
-    cmd = ["python", "script.py"]
-    try:
-        subprocess.run(["uv", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-        cmd = ["uv", "run", "script.py"]
-    except Exception:
-        pass
+    cmd = _AGENT_CMD
 
     try:
         proc = subprocess.Popen(
@@ -923,108 +1430,189 @@ def _start_agent(job_id: str, payload: Dict[str, Any]) -> None:
             env=env,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
+            bufsize=AGENT_READ_CHUNK,
         )
-        job["proc"] = proc
+        _jobs.set_proc(job_id, proc)
         assert proc.stdout is not None
-        for line in proc.stdout:
-            q.put(line.rstrip("\n"))
+        if fcntl is not None and hasattr(fcntl, "F_SETPIPE_SZ"):
+            try:
+                fcntl.fcntl(proc.stdout.fileno(), fcntl.F_SETPIPE_SZ, AGENT_PIPE_SIZE)
+            except OSError:
+                pass  # above /proc/sys/fs/pipe-max-size; keep the default
     except Exception as e:
-        q.put(f"[web] Failed to start agent: {e}")
+        feed.publish(f"[web] Failed to start agent: {e}")
+        feed.close()
+        return None
+
+    if _log_pump is not None:
+        return _log_pump.add(proc, feed)
+    drained = threading.Event()
+    try:
+        for raw in proc.stdout:
+            feed.publish(raw.decode("utf-8", "replace").rstrip("\r\n"))
+    finally:
+        drained.set()
+    return drained
+
+# Agent jobs run on a bounded pool: each worker holds its slot until the agent process
+# exits, so at most MAX_JOBS browsers run at once and further jobs queue behind them.
+# Beyond MAX_JOB_BACKLOG queued jobs, new submissions are rejected with 429.
+MAX_JOBS = int(os.environ.get("KRAIG_MAX_JOBS", "8"))
+MAX_JOB_BACKLOG = int(os.environ.get("KRAIG_MAX_JOB_BACKLOG", "16"))
+_job_pool = ThreadPoolExecutor(max_workers=MAX_JOBS, thread_name_prefix="kraig-job")
+_jobs_lock = threading.Lock()
+_jobs_in_flight = 0  # submitted and not yet finished (running + queued)
+AGENT_DRAIN_TIMEOUT = 5
+
+def _run_agent_job(job_id: str, payload: Dict[str, Any]) -> None:
+    global _jobs_in_flight
+    try:
+        drained = _start_agent(job_id, payload)
+        proc = _jobs.proc(job_id)
+        if drained is not None and proc is not None:
+            code = proc.wait()
+            # Let the pump forward the last lines first, but don't hang on a child process
+            # (e.g. Chromium) that keeps the pipe open after the agent itself has exited
+            drained.wait(timeout=AGENT_DRAIN_TIMEOUT)
+            feed = _jobs.feed(job_id)
+            feed.publish(f"[web] Agent exited with code {code}")
+            feed.close()
     finally:
-        if job.get("proc"):
-            ret = job["proc"].wait()
-            q.put(f"[web] Agent exited with code {ret}")
-        q.put("__DONE__")
+        _jobs.finish(job_id)
+        with _jobs_lock:
+            _jobs_in_flight -= 1
+
+def _reap_jobs() -> None:
+    """Forget expired jobs and delete their job directories; also sweep expired sessions."""
+    while True:
+        time.sleep(JOB_REAP_INTERVAL)
+        _session_expire()
+        for job_id in _jobs.expire():
+            shutil.rmtree(JOBS_DIR / job_id, ignore_errors=True)
+
+threading.Thread(target=_reap_jobs, name="job-reaper", daemon=True).start()
+
+def _report_job_failure(job_id: str, future) -> None:
+    """Done-callback: make sure the event stream ends if the job itself crashed."""
+    e = future.exception()
+    if e is not None:
+        feed = _jobs.feed(job_id)
+        feed.publish(f"[web] Job failed: {e}")
+        feed.close()
 
 @app.route("/post_listing", methods=["POST"])
 def post_listing():
+    global _jobs_in_flight
     try:
-        payload = {}
-        try:
-            payload = json.loads(request.form.get("session_payload", "{}")) or {}
-        except Exception:
-            payload = {}
+        with _jobs_lock:
+            busy = _jobs_in_flight >= MAX_JOBS + MAX_JOB_BACKLOG
+        if busy:
+            return _index_page("Too many posting jobs in progress; please try again shortly."), 429
+
+        sid = (request.form.get("sid") or "").strip()
+        # Images are written to the job dir below, so the session can be released now
+        payload = _session_get(sid, pop=True) if sid else {}
         if not payload:
-            return render_template_string(INDEX_HTML, categories=CATEGORIES, error_msg="Missing session payload; please start over.")
+            return _index_page("Missing session payload; please start over.")
 
         # Create job directory
-        job_id = str(uuid.uuid4())[:8]
+        job_id = secrets.token_hex(4)
         job_dir = JOBS_DIR / job_id
         job_dir.mkdir(parents=True, exist_ok=True)
 
         # Save images for agent
         saved_paths = _save_images_for_job(job_dir, payload.get("images", []))
         if not saved_paths:
-            return render_template_string(INDEX_HTML, categories=CATEGORIES, error_msg="No images available to post; please start over.")
+            return _index_page("No images available to post; please start over.")
+
+        # Hand the agent its photo list as a file rather than an env var, which has size limits
+        manifest = job_dir / "manifest.json"
+        manifest.write_bytes(orjson.dumps({"images": saved_paths}))
 
         # Prepare magic link file
         magic_link_file = job_dir / "magic_link.txt"
         magic_link_file.write_text("", encoding="utf-8")
 
         # Register job
-        q: "queue.Queue[str]" = queue.Queue()
-        _job_registry[job_id] = {"queue": q, "proc": None, "magic_link_file": magic_link_file}
+        feed = _JobFeed()
+        _jobs.add(job_id, feed, magic_link_file)
 
         # Payload for agent thread
         payload_for_agent = {
             "result": payload.get("result", {}),
             "email": payload.get("email", ""),
             "address": payload.get("address", ""),
-            "images": saved_paths,
+            "manifest": str(manifest),
         }
 
-        t = threading.Thread(target=_start_agent, args=(job_id, payload_for_agent), daemon=True)
-        t.start()
+        with _jobs_lock:
+            _jobs_in_flight += 1
+            queued = _jobs_in_flight > MAX_JOBS
+        if queued:
+            feed.publish("[web] All agent slots are busy; the job is queued and will start shortly.")
+        future = _job_pool.submit(_run_agent_job, job_id, payload_for_agent)
+        future.add_done_callback(lambda f: _report_job_failure(job_id, f))
 
         return redirect(url_for("job", job_id=job_id))
     except Exception as e:
-        return render_template_string(INDEX_HTML, categories=CATEGORIES, error_msg=f"Failed to start job: {e}")
+        return INDEX_TPL.render(categories=CATEGORIES, error_msg=f"Failed to start job: {e}")
 
 @app.route("/job/<job_id>", methods=["GET"])
 def job(job_id: str):
-    if job_id not in _job_registry:
-        return render_template_string(INDEX_HTML, categories=CATEGORIES, error_msg="Unknown job ID.")
-    return render_template_string(JOB_HTML, job_id=job_id)
+    if job_id not in _jobs:
+        return _index_page("Unknown job ID.")
+    return JOB_TPL.render(job_id=job_id)
+
+# Keep-alive interval for idle event streams, and headers that stop caches/proxies
+# (e.g. nginx) from buffering the stream
+SSE_KEEPALIVE = 15
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Connection": "keep-alive"}
+
+def _sse_heartbeat() -> None:
+    """One thread pings every open stream, so the streams themselves block without timeouts."""
+    while True:
+        time.sleep(SSE_KEEPALIVE)
+        for feed in list(_jobs.feeds):
+            feed.ping()
+
+threading.Thread(target=_sse_heartbeat, name="sse-heartbeat", daemon=True).start()
 
 @app.route("/events/<job_id>", methods=["GET"])
 def events(job_id: str):
-    if job_id not in _job_registry:
+    if job_id not in _jobs:
         return Response("data: {\"type\":\"line\",\"value\":\"Unknown job\"}\n\n", mimetype="text/event-stream")
 
-    q: "queue.Queue[str]" = _job_registry[job_id]["queue"]
+    feed = _jobs.feed(job_id)
 
     def gen():
+        sq = feed.subscribe()
         try:
-            yield f"data: {json.dumps({'type':'line','value':'[web] Streaming started'})}\n\n"
+            yield _sse_frame("line", "[web] Streaming started")
             while True:
-                try:
-                    line = q.get(timeout=0.5)
-                except queue.Empty:
-                    continue
-                if line == "__DONE__":
-                    yield f"data: {json.dumps({'type':'done','value':'done'})}\n\n"
+                frame = sq.get()
+                yield frame
+                if frame is _DONE_FRAME:
                     break
-                yield f"data: {json.dumps({'type':'line','value':line})}\n\n"
         except GeneratorExit:
             pass
         except Exception as e:
-            yield f"data: {json.dumps({'type':'line','value':f'[web] SSE error: {e}'})}\n\n"
+            yield _sse_frame("line", f"[web] SSE error: {e}")
+        finally:
+            feed.unsubscribe(sq)
 
-    return Response(gen(), mimetype="text/event-stream")
+    return Response(gen(), mimetype="text/event-stream", headers=SSE_HEADERS)
 
 @app.route("/submit_magic_link/<job_id>", methods=["POST"])
 def submit_magic_link(job_id: str):
-    if job_id not in _job_registry:
-        return render_template_string(INDEX_HTML, categories=CATEGORIES, error_msg="Unknown job ID.")
+    if job_id not in _jobs:
+        return _index_page("Unknown job ID.")
     magic_link = (request.form.get("magic_link") or "").strip()
-    file_path: Path = _job_registry[job_id]["magic_link_file"]
+    file_path = _jobs.magic_link_file(job_id)
     try:
         file_path.write_text(magic_link, encoding="utf-8")
         return redirect(url_for("job", job_id=job_id))
     except Exception as e:
-        return render_template_string(INDEX_HTML, categories=CATEGORIES, error_msg=f"Failed to submit magic link: {e}")
+        return INDEX_TPL.render(categories=CATEGORIES, error_msg=f"Failed to submit magic link: {e}")
 
 # ---------------------------------------------------------------------------------
 # Run
@@ -0,0 +1,8 @@
+# wsgi.py - WSGI entry point for serving Kraig (web.py) under a production server
+# ---------------------------------------------------------------------------------
+# Run (single worker: job registry and sessions live in process memory; gevent
+# greenlets give each SSE client a cheap connection instead of an OS thread):
+#   gunicorn wsgi:app -k gevent -w 1 --worker-connections 1000 --timeout 0 --bind 0.0.0.0:5000
+# ---------------------------------------------------------------------------------
+
+from web import app  # noqa: F401